@@ -0,0 +1,77 @@
+"""
+Render time of paginated AccountOut lists per API renderer.
+
+    python benchmarks/api_renderers.py --rows 1000 -n 50
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from ninja.renderers import JSONRenderer  # noqa: E402
+
+from config.utils.renderers import ORJSONRenderer, iter_json  # noqa: E402
+from rest_auth.models import EmailAccount  # noqa: E402
+from rest_auth.schemas import AccountOut  # noqa: E402
+
+
+def accounts(rows):
+    now = timezone.now()
+    return [
+        EmailAccount(
+            id=uuid.uuid4(), email='user{}@example.com'.format(index), first_name='First', last_name='Last',
+            phone_number='+10000000000', company_name='Company', date_joined=now, is_verified=bool(index % 2),
+        )
+        for index in range(rows)
+    ]
+
+
+def page(rows):
+    return {
+        'total_count': len(rows),
+        'per_page': len(rows),
+        'page_count': 1,
+        'data': [AccountOut.from_orm(account).dict() for account in rows],
+    }
+
+
+def measure(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('-n', '--iterations', type=int, default=50)
+    options = parser.parse_args()
+
+    rows = accounts(options.rows)
+    data = page(rows)
+    cases = {
+        'ninja JSONRenderer': lambda: JSONRenderer().render(None, data, response_status=200),
+        'ORJSONRenderer': lambda: ORJSONRenderer().render(None, data, response_status=200),
+        'iter_json (streamed, schema per row)': lambda: b''.join(
+            iter_json(dict(data, data=iter(rows)), schema=AccountOut)
+        ),
+    }
+
+    print('{} AccountOut rows, mean of {} renders'.format(options.rows, options.iterations))
+    for name, func in cases.items():
+        print('  {:<40} {:>8.2f} ms'.format(name, measure(func, options.iterations)))
+
+
+if __name__ == '__main__':
+    main()
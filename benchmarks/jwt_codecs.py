@@ -0,0 +1,92 @@
+"""
+Encode/decode throughput of the token codecs.
+
+    python benchmarks/jwt_codecs.py -n 20000
+
+python-jose and PyJWT are measured too when they are importable.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa  # noqa: E402
+
+from config.utils.permissions import AsymmetricCodec, HMACCodec  # noqa: E402
+
+SECRET = 'benchmark-secret'
+
+
+def payload():
+    return {
+        'id': '8a0c7a0e-5a43-4d7e-9a3c-1f0a8d8f2b61',
+        'exp': datetime.utcnow() + timedelta(minutes=15),
+        'sub': 'access',
+        'is_staff': False,
+        'is_verified': True,
+    }
+
+
+def codecs():
+    yield 'HMACCodec HS256', HMACCodec(SECRET).encode, HMACCodec(SECRET).decode
+
+    try:
+        from jose import jwt as jose_jwt
+    except ImportError:
+        pass
+    else:
+        yield ('python-jose HS256',
+               lambda data: jose_jwt.encode(data, SECRET, algorithm='HS256'),
+               lambda token: jose_jwt.decode(token, SECRET, algorithms=['HS256']))
+
+    try:
+        import jwt as pyjwt
+    except ImportError:
+        pass
+    else:
+        yield ('PyJWT HS256',
+               lambda data: pyjwt.encode(data, SECRET, algorithm='HS256'),
+               lambda token: pyjwt.decode(token, SECRET, algorithms=['HS256']))
+
+    rs256 = AsymmetricCodec('RS256', {}, {'rsa': rsa.generate_private_key(65537, 2048)}, active_kid='rsa')
+    yield 'AsymmetricCodec RS256', rs256.encode, rs256.decode
+
+    eddsa = AsymmetricCodec('EdDSA', {}, {'ed': ed25519.Ed25519PrivateKey.generate()}, active_kid='ed')
+    yield 'AsymmetricCodec EdDSA', eddsa.encode, eddsa.decode
+
+
+def measure(func, args, iterations):
+    started = time.perf_counter()
+    for arg in args:
+        func(arg)
+    return iterations / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=10000)
+    options = parser.parse_args()
+
+    print('{:<24} {:>14} {:>14}'.format('codec', 'encode/s', 'decode/s'))
+    for name, encode, decode in codecs():
+        payloads = [payload() for _ in range(options.iterations)]
+        encoded = encode(payloads[0])
+        tokens = [encoded] * options.iterations
+        print('{:<24} {:>14,.0f} {:>14,.0f}'.format(
+            name,
+            measure(encode, payloads, options.iterations),
+            measure(decode, tokens, options.iterations),
+        ))
+
+
+if __name__ == '__main__':
+    main()
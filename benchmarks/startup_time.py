@@ -0,0 +1,58 @@
+"""
+Cold-start import time of a worker, with and without API_ONLY.
+
+    python benchmarks/startup_time.py --top 15
+
+Each mode runs in a fresh interpreter under ``python -X importtime`` that
+sets up Django and imports the URLconf, as a worker does before serving.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+STARTUP = (
+    "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings'); "
+    "import django; django.setup(); import config.urls"
+)
+
+
+def import_times(api_only):
+    env = dict(os.environ, API_ONLY=str(api_only))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode:
+        error = (result.stderr.strip().splitlines() or ['exit code {}'.format(result.returncode)])[-1]
+        sys.exit('API_ONLY={}: {}'.format(api_only, error))
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--top', type=int, default=10, help='Modules to list per mode')
+    options = parser.parse_args()
+
+    for api_only in (False, True):
+        times = import_times(api_only)
+        total = sum(self_us for _, self_us, _ in times)
+        print('API_ONLY={}: {} modules, {:.1f} ms'.format(api_only, len(times), total / 1000))
+        for name, self_us, cumulative_us in sorted(times, key=lambda item: item[1], reverse=True)[:options.top]:
+            print('  {:<50} self {:>8.1f} ms  cumulative {:>8.1f} ms'.format(
+                name, self_us / 1000, cumulative_us / 1000))
+        print()
+
+
+if __name__ == '__main__':
+    main()
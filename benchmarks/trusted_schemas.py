@@ -0,0 +1,66 @@
+"""
+AccountOut construction for 1k-row lists, validated vs TrustedSchema.
+
+    python benchmarks/trusted_schemas.py --rows 1000 -n 20
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+from ninja import Schema  # noqa: E402
+
+from rest_auth.models import EmailAccount  # noqa: E402
+from rest_auth.schemas import AccountOut  # noqa: E402
+
+# Same fields as AccountOut, with pydantic validation (EmailStr included).
+ValidatedAccountOut = type('ValidatedAccountOut', (Schema,), {
+    '__annotations__': dict(AccountOut.__annotations__),
+    **{name: field.default for name, field in AccountOut.__fields__.items() if not field.required},
+})
+
+
+def accounts(rows):
+    now = timezone.now()
+    return [
+        EmailAccount(
+            id=uuid.uuid4(), email='user{}@example.com'.format(index), first_name='First', last_name='Last',
+            phone_number='+10000000000', company_name='Company', date_joined=now, is_verified=bool(index % 2),
+        )
+        for index in range(rows)
+    ]
+
+
+def measure(schema, rows, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        [schema.from_orm(row).dict() for row in rows]
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('-n', '--iterations', type=int, default=20)
+    options = parser.parse_args()
+
+    rows = accounts(options.rows)
+    validated = measure(ValidatedAccountOut, rows, options.iterations)
+    trusted = measure(AccountOut, rows, options.iterations)
+    print('{} rows, from_orm().dict() per row, mean of {} runs'.format(options.rows, options.iterations))
+    print('  {:<28} {:>8.2f} ms'.format('validated Schema', validated))
+    print('  {:<28} {:>8.2f} ms  ({:.1f}x)'.format('TrustedSchema', trusted, validated / trusted))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Insert throughput and primary key index size, uuid4 against uuid7.
+
+    python benchmarks/uuid_keys.py --rows 200000
+    DATABASE_URL=postgres://... python benchmarks/uuid_keys.py --rows 200000
+
+Runs against the default database (SQLite or PostgreSQL) in scratch tables
+that are dropped afterwards. On SQLite the index size needs the dbstat
+virtual table; it is reported as n/a when SQLite was built without it.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from config.utils.utils import uuid7  # noqa: E402
+
+GENERATORS = {'uuid4': uuid.uuid4, 'uuid7': uuid7}
+
+
+def column_type():
+    return 'uuid' if connection.vendor == 'postgresql' else 'char(32)'
+
+
+def db_value(value):
+    # Django stores UUIDField as uuid on PostgreSQL and as 32 hex chars elsewhere.
+    return str(value) if connection.vendor == 'postgresql' else value.hex
+
+
+def index_bytes(cursor, table):
+    if connection.vendor == 'postgresql':
+        cursor.execute('SELECT pg_relation_size(%s)', ['{}_pkey'.format(table)])
+        return cursor.fetchone()[0]
+    try:
+        cursor.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = (SELECT name FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = %s)", [table]
+        )
+    except Exception:
+        return None
+    return cursor.fetchone()[0]
+
+
+def run(name, generate, rows, batch_size):
+    table = 'bench_{}_keys'.format(name)
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS {}'.format(table))
+        cursor.execute('CREATE TABLE {} (id {} PRIMARY KEY, payload varchar(32) NOT NULL)'.format(table, column_type()))
+
+        sql = 'INSERT INTO {} (id, payload) VALUES (%s, %s)'.format(table)
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = [(db_value(generate()), 'row') for _ in range(min(batch_size, rows - offset))]
+            with transaction.atomic():
+                cursor.executemany(sql, batch)
+        elapsed = time.perf_counter() - started
+
+        size = index_bytes(cursor, table)
+        cursor.execute('DROP TABLE {}'.format(table))
+    return rows / elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    options = parser.parse_args()
+
+    print('{} rows on {}'.format(options.rows, connection.vendor))
+    for name, generate in GENERATORS.items():
+        rate, size = run(name, generate, options.rows, options.batch_size)
+        print('  {:<6} {:>10,.0f} rows/s   pk index {}'.format(
+            name, rate, '{:.1f} MB'.format(size / 1024 / 1024) if size is not None else 'n/a'
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+PostgreSQL backend that hands out connections from an in-process pool.
+
+Enable it with ``'ENGINE': 'config.db.backends.postgresql_pool'`` and an
+optional ``'POOL'`` dict in the database settings::
+
+    'POOL': {'MAX_SIZE': 20, 'TIMEOUT': 5, 'HEALTH_CHECK_INTERVAL': 30}
+
+Closing a Django connection (end of request with CONN_MAX_AGE = 0) returns
+it to the pool instead of tearing the socket down.
+"""
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, max_size=20, timeout=5.0, health_check_interval=30.0):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'timeouts': 0,
+            'opened': 0,
+            'discarded': 0,
+        }
+
+    def checkout(self):
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise OperationalError(
+                'No database connection available after {}s (pool size {})'.format(self.timeout, self.max_size)
+            )
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, last_used = self._idle.pop()
+                if self._is_usable(connection, last_used):
+                    return connection
+                self._discard(connection)
+
+            connection = self.connect()
+            with self._lock:
+                self._stats['opened'] += 1
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def checkin(self, connection):
+        try:
+            if connection.closed:
+                self._discard(connection)
+                return
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        except Exception:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def _is_usable(self, connection, last_used):
+        if connection.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, connection):
+        with self._lock:
+            self._stats['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['size'] = self.max_size
+        stats['mean_wait_seconds'] = stats['wait_seconds'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+
+def pool_stats():
+    """Per-alias pool counters, including time spent waiting for a connection."""
+    return {alias: pool.stats() for alias, pool in list(_pools.items())}
+
+
+def _forget_pools():
+    # Connections opened before a fork belong to the parent process.
+    _pools.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self, conn_params):
+        pool = _pools.get(self.alias)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(self.alias)
+                if pool is None:
+                    options = self.settings_dict.get('POOL', {})
+                    pool = _pools[self.alias] = ConnectionPool(
+                        connect=partial(super().get_new_connection, conn_params),
+                        max_size=options.get('MAX_SIZE', 20),
+                        timeout=options.get('TIMEOUT', 5.0),
+                        health_check_interval=options.get('HEALTH_CHECK_INTERVAL', 30.0),
+                    )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool(conn_params).checkout()
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                pool = _pools.get(self.alias)
+                if pool is None:
+                    return self.connection.close()
+                return pool.checkin(self.connection)
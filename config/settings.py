@@ -1,23 +1,9 @@
 import os
 from pathlib import Path
 
-import pretty_errors
-from decouple import config
+from decouple import Csv, config
 from dj_database_url import parse as db_url
 
-pretty_errors.configure(
-    separator_character='*',
-    filename_display=pretty_errors.FILENAME_EXTENDED,
-    line_number_first=True,
-    display_link=True,
-    lines_before=5,
-    lines_after=2,
-    line_color=pretty_errors.RED + '> ' + pretty_errors.default_config.line_color,
-    code_color='  ' + pretty_errors.default_config.line_color,
-    truncate_code=True,
-    display_locals=True
-)
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,6 +16,25 @@ SECRET_KEY = config('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=False, cast=bool)
 
+# API-only workers skip the admin, its UI apps and debug tooling
+API_ONLY = config('API_ONLY', default=False, cast=bool)
+
+if DEBUG and not API_ONLY:
+    import pretty_errors
+
+    pretty_errors.configure(
+        separator_character='*',
+        filename_display=pretty_errors.FILENAME_EXTENDED,
+        line_number_first=True,
+        display_link=True,
+        lines_before=5,
+        lines_after=2,
+        line_color=pretty_errors.RED + '> ' + pretty_errors.default_config.line_color,
+        code_color='  ' + pretty_errors.default_config.line_color,
+        truncate_code=True,
+        display_locals=True
+    )
+
 ALLOWED_HOSTS = ['*']
 
 # Application definition
@@ -47,13 +52,13 @@ INSTALLED_APPS = [
     'corsheaders',
     'ckeditor',
     'django_extensions',
-    # 'silk',
     'ratelimit',
 
     'rest_auth',
 ]
 
 MIDDLEWARE = [
+    'config.utils.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -62,9 +67,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    # 'silk.middleware.SilkyMiddleware',
 ]
 
+ADMIN_UI_APPS = ['jazzmin', 'django.contrib.admin', 'django.contrib.messages', 'ckeditor', 'django_extensions']
+
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_UI_APPS]
+    MIDDLEWARE.remove('django.contrib.messages.middleware.MessageMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -77,8 +87,7 @@ TEMPLATES = [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
+            ] + ([] if API_ONLY else ['django.contrib.messages.context_processors.messages']),
         },
     },
 ]
@@ -95,6 +104,63 @@ DATABASES = {
     )
 }
 
+# Keep connections open between requests (seconds, 0 closes after each request)
+DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+# In-process pool for PostgreSQL: requests borrow a health-checked connection
+# and return it when Django closes theirs, which also suits ASGI workers.
+if config('DB_POOL', default=False, cast=bool):
+    DATABASES['default'].update({
+        'ENGINE': 'config.db.backends.postgresql_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=20, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=5.0, cast=float),
+            'HEALTH_CHECK_INTERVAL': config('DB_POOL_HEALTH_CHECK_INTERVAL', default=30.0, cast=float),
+        },
+    })
+
+# Cache
+# Per-process LRU in front of a cache shared by all workers (file based by
+# default; set CACHE_BACKEND to DatabaseCache and run createcachetable to
+# share it across hosts). The file cache checks MAX_ENTRIES at most every
+# CACHE_CULL_INTERVAL seconds, since each check lists the whole directory.
+# Sessions use the shared cache directly, so a logout is seen by every worker
+# at once. Ratelimit counters need an atomic incr: a file locked cache by
+# default, or set RATELIMIT_CACHE_BACKEND and RATELIMIT_CACHE_LOCATION to
+# memcached for several hosts.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'config.utils.cache.TwoTierCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': config('CACHE_L1_MAX_ENTRIES', default=1000, cast=int),
+            'L1_TIMEOUT': config('CACHE_L1_TIMEOUT', default=5, cast=int),
+        },
+    },
+    'shared': {
+        'BACKEND': config('CACHE_BACKEND', default='config.utils.cache.LazyCullFileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, '.cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=20000, cast=int),
+            'CULL_INTERVAL': config('CACHE_CULL_INTERVAL', default=60, cast=int),
+        },
+    },
+    'ratelimit': {
+        'BACKEND': config('RATELIMIT_CACHE_BACKEND', default='config.utils.cache.LockedFileBasedCache'),
+        'LOCATION': config('RATELIMIT_CACHE_LOCATION', default=os.path.join(BASE_DIR, '.cache', 'ratelimit')),
+    },
+}
+
+RATELIMIT_USE_CACHE = 'ratelimit'
+
+# Seconds a cache_response entry is kept
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=60, cast=int)
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -113,6 +179,25 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The first hasher re-encodes stored hashes on login, set
+# PASSWORD_HASH_ITERATIONS to tune the pbkdf2_sha256 cost. The default 0 keeps
+# Django's own count on purpose, so out of the box hashes cost the same as
+# before; the gain comes from hashing off the request threads (below). Lower
+# it only after measuring, since it weakens every stored hash.
+PASSWORD_HASHERS = [
+    'config.utils.hashing.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=0, cast=int)
+
+# Hashing runs on a process pool (0 workers = in the request thread, or on
+# the 'hashing' thread pool for async handlers); calls beyond MAX_PENDING
+# wait QUEUE_TIMEOUT seconds, then get a 503.
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=2, cast=int)
+PASSWORD_HASHING_MAX_PENDING = config('PASSWORD_HASHING_MAX_PENDING', default=64, cast=int)
+PASSWORD_HASHING_QUEUE_TIMEOUT = config('PASSWORD_HASHING_QUEUE_TIMEOUT', default=2.0, cast=float)
+PASSWORD_HASHING_RETRY_AFTER = config('PASSWORD_HASHING_RETRY_AFTER', default=1, cast=int)
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -144,22 +229,78 @@ SITE_ID = 1
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# SILKY_AUTHENTICATION = True  # User must login
-# SILKY_AUTHORISATION = True  # User must have permissions
-# SILKY_ANALYZE_QUERIES = True
-# SILKY_META = True
+# UUID primary keys of Entity/UUIDModel: 7 (time-ordered, inserts append to
+# the index) or 4 (random). Both fit the same uuid columns.
+PRIMARY_KEY_UUID_VERSION = config('PRIMARY_KEY_UUID_VERSION', default=7, cast=int)
 
-SILKY_PYTHON_PROFILER = True
-SILKY_PYTHON_PROFILER_BINARY = True
-SILKY_ANALYZE_QUERIES = True
-SILKY_PYTHON_PROFILER_RESULT_PATH = 'profile/'
+# Request profiling: paths starting with PROFILING_ROUTES are always
+# profiled, other requests with probability PROFILING_SAMPLE_RATE.
+# Summarize the results with `manage.py profile_report`.
+PROFILING_ROUTES = config('PROFILING_ROUTES', default='', cast=Csv())
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_INTERVAL = config('PROFILING_INTERVAL', default=0.005, cast=float)
+PROFILING_BUFFER_SIZE = config('PROFILING_BUFFER_SIZE', default=1000, cast=int)
+PROFILING_FLUSH_INTERVAL = config('PROFILING_FLUSH_INTERVAL', default=10.0, cast=float)
+PROFILING_RESULT_PATH = os.path.join(BASE_DIR, 'profile')
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# JSON renderer/parser of the NinjaAPI; use ProfiledJSONRenderer and
+# ninja.parser.Parser for the stdlib json implementation
+API_RENDERER = config('API_RENDERER', default='config.utils.renderers.ORJSONRenderer')
+API_PARSER = config('API_PARSER', default='config.utils.renderers.ORJSONParser')
+
 # Use as your requirements
 AUTH_USER_MODEL = 'rest_auth.EmailAccount'
 
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 60 * 24
+ACCESS_TOKEN_EXPIRE_MINUTES = config('ACCESS_TOKEN_EXPIRE_MINUTES', default=15, cast=int)
+REFRESH_TOKEN_EXPIRE_DAYS = config('REFRESH_TOKEN_EXPIRE_DAYS', default=30, cast=int)
+
+# Each login session keeps one row with its refresh token generation. Revoked
+# sessions are also checked in memory until their access tokens expire; each
+# worker pulls new revocations every SYNC_INTERVAL seconds (0 disables the
+# sync thread) and deletes expired rows every SWEEP_INTERVAL seconds
+TOKEN_SESSION_MODEL = 'rest_auth.TokenSession'
+TOKEN_REVOCATION_MODEL = 'rest_auth.RevokedToken'
+TOKEN_REVOCATION_SYNC_INTERVAL = config('TOKEN_REVOCATION_SYNC_INTERVAL', default=5.0, cast=float)
+TOKEN_REVOCATION_SWEEP_INTERVAL = config('TOKEN_REVOCATION_SWEEP_INTERVAL', default=3600.0, cast=float)
+
+# Serve the auth router with async handlers (run under ASGI)
+ASYNC_AUTH = config('ASYNC_AUTH', default=False, cast=bool)
+
+# Thread pool sizes used by async handlers for ORM calls and, without a
+# hashing process pool, password hashing
+ASYNC_EXECUTOR_WORKERS = {
+    'db': config('ASYNC_DB_WORKERS', default=0, cast=int),
+    'hashing': config('ASYNC_HASHING_WORKERS', default=0, cast=int),
+}
+
+# SingletonModel.load() serves a per-process copy, checking the shared
+# version key at most every SINGLETON_CACHE_RECHECK seconds
+SINGLETON_CACHE_RECHECK = config('SINGLETON_CACHE_RECHECK', default=1.0, cast=float)
+
+# Where SoftDeleteSignalsManager.purge checkpoints its progress
+PURGE_CHECKPOINT_MODEL = 'rest_auth.PurgeCheckpoint'
+
+# Rows per INSERT/UPDATE statement in SignalsManager bulk writes
+SIGNALS_BULK_BATCH_SIZE = config('SIGNALS_BULK_BATCH_SIZE', default=1000, cast=int)
+
+# Verified bearer tokens kept in memory per worker
+TOKEN_CACHE_SIZE = config('TOKEN_CACHE_SIZE', default=1024, cast=int)
+
+# Token signing: HS256/HS384/HS512 use SECRET_KEY; RS256 and EdDSA read PEM
+# data or file paths keyed by kid. Tokens are signed with JWT_ACTIVE_KID and
+# verified with the key named in their header, so old kids keep verifying
+# until they are removed. JWT_CODEC overrides all of it with an import path.
+JWT_ALGORITHM = config('JWT_ALGORITHM', default='HS256')
+JWT_ACTIVE_KID = config('JWT_ACTIVE_KID', default=None)
+JWT_PRIVATE_KEYS = {JWT_ACTIVE_KID: config('JWT_PRIVATE_KEY')} if config('JWT_PRIVATE_KEY', default='') else {}
+JWT_PUBLIC_KEYS = {
+    kid: path for kid, path in (
+        item.split('=', 1) for item in config('JWT_PUBLIC_KEYS', default='', cast=Csv())
+    )
+}
+JWT_CODEC = config('JWT_CODEC', default=None)
 
 
 # LOGGING = {
@@ -177,9 +318,9 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 60 * 24
 #         }
 #     },
 #     'loggers': {
-#         'silk': {
+#         'django.db.backends': {
 #             'handlers': ['console'],
 #             'level': 'DEBUG'
 #         }
 #     },
-# }
\ No newline at end of file
+# }
@@ -1,19 +1,43 @@
+from django.apps import apps
 from django.conf import settings
-from django.contrib import admin
-from django.urls import path, include
+from django.urls import path
+from django.utils.module_loading import import_string
 
 from ninja import NinjaAPI
 
+from config.utils.hashing import HashingUnavailable
+from config.utils.utils import InvalidCursor
+from rest_auth.controllers.async_auth_controller import async_auth_controller
+from rest_auth.controllers.auth_controller import auth_controller
+
 api = NinjaAPI(
     version='1.0.0',
     title='client API v1',
     description='API documentation',
+    renderer=import_string(settings.API_RENDERER)(),
+    parser=import_string(settings.API_PARSER)(),
 )
 
+
+@api.exception_handler(HashingUnavailable)
+def hashing_unavailable(request, exc):
+    response = api.create_response(request, {'message': 'Server busy, please try again.'}, status=503)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+@api.exception_handler(InvalidCursor)
+def invalid_cursor(request, exc):
+    return api.create_response(request, {'message': str(exc)}, status=400)
+
+
+api.add_router('/auth/', async_auth_controller if settings.ASYNC_AUTH else auth_controller)
+
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/', api.urls)
 ]
 
-# if settings.DEBUG:
-#     urlpatterns += [path('silk/', include('silk.urls', namespace='silk'))]
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns += [path('admin/', admin.site.urls)]
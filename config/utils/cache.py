@@ -0,0 +1,232 @@
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+GENERATION_KEY = 'two-tier:generation'
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """ Bounded per-process LRU (L1) in front of a shared cache alias (L2).
+
+    Writes go through to L2. L1 copies live at most ``L1_TIMEOUT`` seconds,
+    and every worker drops its whole L1 once the shared generation changes
+    (``clear()`` / ``invalidate()``). Counters (``add``/``incr``/``decr``)
+    always go to L2. Keys that must change in every worker at once, such as
+    version keys, should skip L1 through ``shared_cache``.
+
+    OPTIONS: ``L2`` (alias, default 'shared'), ``L1_MAX_ENTRIES``,
+    ``L1_TIMEOUT`` and ``GENERATION_CHECK_INTERVAL``.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', location or 'shared')
+        self._l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._generation_check_interval = options.get('GENERATION_CHECK_INTERVAL', 1)
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = 0.0
+        self._stats = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0}
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now - self._generation_checked_at < self._generation_check_interval:
+            return
+        self._generation_checked_at = now
+        generation = self.l2.get(GENERATION_KEY)
+        if generation != self._generation:
+            with self._lock:
+                self._l1.clear()
+            self._generation = generation
+
+    def _l1_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        l1_timeout = self._l1_timeout if timeout is None else min(timeout, self._l1_timeout)
+        if l1_timeout <= 0:
+            self._l1_discard(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (time.monotonic() + l1_timeout, pickled)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _l1_discard(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def get(self, key, default=None, version=None):
+        self._check_generation()
+        l1_key = self._l1_key(key, version)
+        value = self._l1_get(l1_key)
+        if value is not _MISSING:
+            self._count('l1_hits')
+            return value
+
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._l1_set(l1_key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout=timeout, version=version)
+        self._l1_set(self._l1_key(key, version), value, timeout)
+        self._count('sets')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout=timeout, version=version)
+        self._l1_discard(self._l1_key(key, version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_discard(self._l1_key(key, version))
+        return self.l2.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        self._check_generation()
+        if self._l1_get(self._l1_key(key, version)) is not _MISSING:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_discard(self._l1_key(key, version))
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._l1_discard(self._l1_key(key, version))
+        return self.l2.decr(key, delta, version=version)
+
+    def clear(self):
+        self.l2.clear()
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop every worker's L1 copies; L2 is left untouched."""
+        generation = uuid.uuid4().hex
+        self.l2.set(GENERATION_KEY, generation, None)
+        with self._lock:
+            self._l1.clear()
+        self._generation = generation
+        self._generation_checked_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['l1_entries'] = len(self._l1)
+        lookups = stats['l1_hits'] + stats['l2_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['l1_hits'] + stats['l2_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+def get_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    backend = caches[alias]
+    return backend.l2 if isinstance(backend, TwoTierCache) else backend
+
+
+class SharedCacheProxy:
+    """ ``caches[alias]`` without TwoTierCache's per-process copies. """
+
+    def __init__(self, alias=DEFAULT_CACHE_ALIAS):
+        self._alias = alias
+
+    def __getattr__(self, name):
+        return getattr(get_shared_cache(self._alias), name)
+
+
+shared_cache = SharedCacheProxy()
+
+
+_culled_at = {}
+_culled_at_lock = threading.Lock()
+
+
+class LazyCullFileBasedCache(FileBasedCache):
+    """ FileBasedCache that lists its directory to cull at most once every
+    ``CULL_INTERVAL`` seconds (OPTIONS, default 60) per process, rather than
+    on every ``set()``. The entry count can overshoot ``MAX_ENTRIES`` in
+    between.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_interval = params.get('OPTIONS', {}).get('CULL_INTERVAL', 60)
+
+    def _cull(self):
+        now = time.monotonic()
+        with _culled_at_lock:
+            culled_at = _culled_at.get(self._dir)
+            if culled_at is not None and now - culled_at < self._cull_interval:
+                return
+            _culled_at[self._dir] = now
+        super()._cull()
+
+
+class LockedFileBasedCache(LazyCullFileBasedCache):
+    """ File cache whose ``add``/``incr``/``decr`` hold an exclusive file
+    lock, so counters stay exact across the threads and processes of a host.
+    """
+
+    @contextmanager
+    def _counter_lock(self):
+        self._createdir()
+        with open(os.path.join(self._dir, 'counters.lock'), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._counter_lock():
+            return super().add(key, value, timeout=timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._counter_lock():
+            return super().incr(key, delta, version=version)
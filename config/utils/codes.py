@@ -0,0 +1,64 @@
+import threading
+from collections import deque
+
+from django.conf import settings
+
+from .utils import generate_random_code
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class CodePool:
+    """ Unused random codes for one unique column, reserved in blocks.
+
+    A block is drawn at random and checked with a single ``IN`` query;
+    codes already in the table are dropped. Another process can still take
+    a pooled code first, so inserts retry on a unique violation (see
+    ``CodeModel.save`` and ``CodeQuerySet.bulk_create``).
+    """
+
+    def __init__(self, model, field_name, length=8, block_size=100):
+        self.model = model
+        self.field_name = field_name
+        self.length = length
+        self.block_size = block_size
+        self._codes = deque()
+        self._lock = threading.Lock()
+
+    def reserve(self, count):
+        codes = set()
+        while len(codes) < count:
+            candidates = {generate_random_code(self.length) for _ in range(count - len(codes))} - codes
+            taken = self.model._default_manager.filter(
+                **{'{}__in'.format(self.field_name): candidates}
+            ).values_list(self.field_name, flat=True)
+            codes |= candidates.difference(taken)
+        return codes
+
+    def take(self):
+        with self._lock:
+            if not self._codes:
+                self._codes.extend(self.reserve(self.block_size))
+            return self._codes.popleft()
+
+    def discard(self):
+        with self._lock:
+            self._codes.clear()
+
+    def __len__(self):
+        return len(self._codes)
+
+
+def code_pool(model, field_name, length=8):
+    key = (model._meta.label, field_name)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = CodePool(
+                    model, field_name, length=length,
+                    block_size=getattr(settings, 'CODE_POOL_BLOCK_SIZE', 100),
+                )
+    return pool
@@ -0,0 +1,52 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .profiling import record_queries
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name):
+    """
+    Description:Bounded thread pools for async handlers; excess work waits in
+    the pool queue instead of starting new threads.\n
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                workers = getattr(settings, 'ASYNC_EXECUTOR_WORKERS', {}).get(name)
+                executor = _executors[name] = ThreadPoolExecutor(
+                    max_workers=workers or min(32, (os.cpu_count() or 1) + 4),
+                    thread_name_prefix='async-{}'.format(name),
+                )
+    return executor
+
+
+def _call_with_connection(func, *args, **kwargs):
+    # Pool threads keep their connection between calls, apply the same
+    # CONN_MAX_AGE / error checks Django runs around requests.
+    close_old_connections()
+    try:
+        with record_queries():
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Carry context variables (the request profile) into the pool thread.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor('db'), partial(context.run, _call_with_connection, func, *args, **kwargs)
+    )
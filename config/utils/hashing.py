@@ -0,0 +1,222 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .executors import get_executor, run_db
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, float('inf'))
+
+
+class HashingUnavailable(Exception):
+    """Raised when the hashing queue is full; served as 503 with Retry-After."""
+
+    def __init__(self, retry_after):
+        super().__init__('Password hashing queue is full')
+        self.retry_after = retry_after
+
+
+class TunedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """pbkdf2_sha256 with the iteration count from PASSWORD_HASH_ITERATIONS,
+    or Django's default when that is 0 (the shipped setting).
+
+    Keeping the algorithm name means stored hashes with another iteration
+    count are reported by must_update() and re-encoded on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', 0) or hashers.PBKDF2PasswordHasher.iterations
+
+
+class HashingMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rejected = 0
+        self.in_flight = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def observe(self, seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.buckets[index] += 1
+                    break
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'mean_seconds': self.total_seconds / self.count if self.count else 0.0,
+                'max_seconds': self.max_seconds,
+                'rejected': self.rejected,
+                'in_flight': self.in_flight,
+                'buckets': dict(zip(LATENCY_BUCKETS, self.buckets)),
+            }
+
+
+def _init_worker(settings_module):
+    if settings_module:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+class HashingPool:
+    """ Runs hashers on a process pool so request threads never hold the GIL
+    while hashing, with at most ``max_pending`` calls queued or running.
+    """
+
+    def __init__(self, workers, max_pending, queue_timeout, retry_after):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.metrics = HashingMetrics()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # A forked web worker must not reuse its parent's pool.
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=_init_worker,
+                        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),),
+                    )
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _acquire(self, blocking):
+        if blocking:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            self.metrics.reject()
+            raise HashingUnavailable(self.retry_after)
+        self.metrics.started()
+        return time.monotonic()
+
+    def _release(self, started):
+        self._slots.release()
+        self.metrics.observe(time.monotonic() - started)
+
+    def run(self, func, *args):
+        started = self._acquire(blocking=True)
+        try:
+            if not self.workers:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._release(started)
+
+    async def arun(self, func, *args):
+        # Never block the event loop on the semaphore: a full queue is
+        # reported straight away.
+        started = self._acquire(blocking=False)
+        try:
+            if not self.workers:
+                # Hash on a thread, not on the event loop.
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(get_executor('hashing'), partial(func, *args))
+            return await asyncio.wrap_future(self._get_executor().submit(func, *args))
+        finally:
+            self._release(started)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hashing_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', 2),
+                    max_pending=getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', 64),
+                    queue_timeout=getattr(settings, 'PASSWORD_HASHING_QUEUE_TIMEOUT', 2.0),
+                    retry_after=getattr(settings, 'PASSWORD_HASHING_RETRY_AFTER', 1),
+                )
+    return _pool
+
+
+def hashing_metrics():
+    return hashing_pool().metrics.snapshot()
+
+
+def needs_upgrade(encoded):
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = hashers.get_hasher()
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def make_password(password):
+    if password is None:
+        return hashers.make_password(None)
+    return hashing_pool().run(hashers.make_password, password)
+
+
+async def amake_password(password):
+    if password is None:
+        return hashers.make_password(None)
+    return await hashing_pool().arun(hashers.make_password, password)
+
+
+def check_password(password, encoded):
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+    return hashing_pool().run(hashers.check_password, password, encoded)
+
+
+async def acheck_password(password, encoded):
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+    return await hashing_pool().arun(hashers.check_password, password, encoded)
+
+
+def verify_password(user, password):
+    """Check ``password`` for ``user``, re-encoding the stored hash with the preferred hasher."""
+    if not check_password(password, user.password):
+        return False
+    if needs_upgrade(user.password):
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    return True
+
+
+async def averify_password(user, password):
+    if not await acheck_password(password, user.password):
+        return False
+    if needs_upgrade(user.password):
+        user.password = await amake_password(password)
+        await run_db(user.save, update_fields=['password'])
+    return True
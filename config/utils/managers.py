@@ -1,11 +1,54 @@
-from django.db import models, transaction
-from django.db.models import QuerySet
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Count, Min, Q, QuerySet
 from django.db.models.deletion import Collector
 from django.utils import timezone
 
+from config.utils.codes import code_pool
+
 REPR_OUTPUT_SIZE = 20
 
 
+def batches(objs, batch_size):
+    for start in range(0, len(objs), batch_size):
+        yield objs[start:start + batch_size]
+
+
+class CodeQuerySet(QuerySet):
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False):
+        """Insert ``objs``, redrawing pooled codes another process took since
+        they were reserved. Explicitly set codes are never replaced; a
+        collision on one fails the batch as usual.
+        """
+        objs = list(objs)
+        field = self.model._meta.get_field('code')
+        pooled = [obj for obj in objs if not obj.code]
+        for obj in pooled:
+            field.pre_save(obj, True)
+
+        retries = getattr(self.model, 'code_retries', 3)
+        for attempt in range(retries):
+            try:
+                with transaction.atomic(using=self.db):
+                    return super().bulk_create(objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts)
+            except IntegrityError:
+                taken = set(self.model._default_manager.using(self.db).filter(
+                    code__in=[obj.code for obj in pooled]
+                ).values_list('code', flat=True))
+                if not taken or attempt == retries - 1:
+                    raise
+                code_pool(self.model, field.attname, field.length).discard()
+                for obj in pooled:
+                    if obj.code in taken:
+                        obj.code = ''
+                        field.pre_save(obj, True)
+
+
 class SignalsManager(models.Manager):
 
     def create(self, **kwargs):
@@ -17,6 +60,82 @@ class SignalsManager(models.Manager):
     def initialize_model_instance(self, **kwargs):
         return self.model(**kwargs)
 
+    def get_bulk_batch_size(self, batch_size=None):
+        return batch_size or getattr(settings, 'SIGNALS_BULK_BATCH_SIZE', 1000)
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False):
+        """Batched INSERTs in one transaction, firing pre_save/post_save per object."""
+        objs = list(objs)
+        batch_size = self.get_bulk_batch_size(batch_size)
+        contexts = []
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            for batch in batches(objs, batch_size):
+                batch_contexts = [obj.get_context(force_insert=True, bulk=True) for obj in batch]
+                self.model.trigger_bulk_event('pre_save', batch, batch_contexts)
+                self.get_queryset().bulk_create(batch, batch_size=batch_size, ignore_conflicts=ignore_conflicts)
+                contexts.extend(batch_contexts)
+
+        self.model.trigger_bulk_event('post_save', objs, contexts)
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        """Batched UPDATEs in one transaction, firing pre_save/post_save per object."""
+        objs = list(objs)
+        batch_size = self.get_bulk_batch_size(batch_size)
+        contexts = []
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            for batch in batches(objs, batch_size):
+                batch_contexts = [obj.get_context(update_fields=fields, bulk=True) for obj in batch]
+                self.model.trigger_bulk_event('pre_save', batch, batch_contexts)
+                self._update_batch(batch, fields, batch_size)
+                contexts.extend(batch_contexts)
+
+        self.model.trigger_bulk_event('post_save', objs, contexts)
+        return objs
+
+    def bulk_upsert(self, objs, fields, batch_size=None):
+        """Insert objects whose pk is not stored yet and update ``fields`` on the rest."""
+        objs = list(objs)
+        batch_size = self.get_bulk_batch_size(batch_size)
+        created, updated, contexts = [], [], []
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            for batch in batches(objs, batch_size):
+                existing = set(
+                    self.model._base_manager.using(self.db).filter(
+                        pk__in=[obj.pk for obj in batch if obj.pk is not None]
+                    ).values_list('pk', flat=True)
+                )
+                batch_contexts = [
+                    obj.get_context(force_insert=obj.pk not in existing, update_fields=fields, bulk=True)
+                    for obj in batch
+                ]
+                self.model.trigger_bulk_event('pre_save', batch, batch_contexts)
+
+                to_create = [obj for obj in batch if obj.pk not in existing]
+                to_update = [obj for obj in batch if obj.pk in existing]
+                if to_create:
+                    self.get_queryset().bulk_create(to_create, batch_size=batch_size)
+                if to_update:
+                    self._update_batch(to_update, fields, batch_size)
+
+                created.extend(to_create)
+                updated.extend(to_update)
+                contexts.extend(batch_contexts)
+
+        self.model.trigger_bulk_event('post_save', objs, contexts)
+        return created, updated
+
+    def _update_batch(self, batch, fields, batch_size):
+        # bulk_update skips Field.pre_save, so auto_now fields would go stale.
+        model_fields = [self.model._meta.get_field(name) for name in fields]
+        for obj in batch:
+            for field in model_fields:
+                field.pre_save(obj, False)
+        self.get_queryset().bulk_update(batch, fields, batch_size=batch_size)
+
 
 class SoftDeleteQuerySet(QuerySet):
     def delete(self):
@@ -69,7 +188,9 @@ class SoftDeleteSignalsManager(SignalsManager):
     def get_queryset(self):
         if self.show_deleted:
             return SoftDeleteQuerySet(self.model, using=self._db)
-        return SoftDeleteQuerySet(self.model, using=self._db).exclude(is_deleted=True)
+        # filter(is_deleted=False) rather than exclude(is_deleted=True) so the
+        # predicate matches the partial live-row index.
+        return SoftDeleteQuerySet(self.model, using=self._db).filter(is_deleted=False)
 
     def delete(self):
         return self.get_queryset().delete()
@@ -87,4 +208,102 @@ class SoftDeleteSignalsManager(SignalsManager):
         return super().filter(*args, **kwargs)
 
     def trash(self):
-        return self.filter(is_deleted=True)
+        return self.filter(is_deleted=True).order_by('-deleted_at')
+
+    def purge(self, older_than, *, batch_size=500, sleep=0, resume=False, callback=None):
+        """Hard-delete trash rows whose deleted_at is older than ``older_than``.
+
+        Rows are walked in primary-key order, ``batch_size`` at a time, each
+        batch in its own transaction with ``sleep`` seconds between batches.
+        The last purged pk is checkpointed in the database, in the batch's
+        transaction, so an interrupted run can continue with ``resume=True``.
+        ``callback`` gets the progress dict after every batch; the final one
+        is returned. Needs the PURGE_CHECKPOINT_MODEL setting.
+        """
+        cutoff = timezone.now() - older_than
+        queryset = SoftDeleteQuerySet(self.model, using=self._db)
+        checkpoints = self.get_checkpoint_model().objects.using(queryset.db)
+        label = self.model._meta.label_lower
+        last_pk = None
+        if resume:
+            checkpoint = checkpoints.filter(model=label).first()
+            if checkpoint is not None:
+                last_pk = self.model._meta.pk.to_python(checkpoint.last_pk)
+
+        candidates = queryset.filter(is_deleted=True, deleted_at__lt=cutoff).order_by('pk')
+        progress = {'deleted': 0, 'rows': 0, 'batches': 0, 'last_pk': last_pk, 'elapsed': 0.0, 'rate': 0.0}
+        started = time.monotonic()
+
+        while True:
+            batch = candidates if last_pk is None else candidates.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+
+            last_pk = pks[-1]
+            with transaction.atomic(using=queryset.db):
+                # Lock and re-check the rows: one restored since it was listed is kept.
+                locked = list(candidates.filter(pk__in=pks).select_for_update().values_list('pk', flat=True))
+                deleted, rows_count = queryset.filter(
+                    pk__in=locked, is_deleted=True, deleted_at__lt=cutoff
+                ).hard_delete() if locked else (0, {})
+                checkpoints.update_or_create(model=label, defaults={'last_pk': str(last_pk)})
+
+            progress['deleted'] += rows_count.get(self.model._meta.label, 0)
+            progress['rows'] += deleted
+            progress['batches'] += 1
+            progress['last_pk'] = last_pk
+            progress['elapsed'] = time.monotonic() - started
+            progress['rate'] = progress['rows'] / progress['elapsed'] if progress['elapsed'] else 0.0
+            if callback is not None:
+                callback(dict(progress))
+
+            if len(pks) < batch_size:
+                break
+            if sleep:
+                time.sleep(sleep)
+
+        checkpoints.filter(model=label).delete()
+        progress['elapsed'] = time.monotonic() - started
+        return progress
+
+    @staticmethod
+    def get_checkpoint_model():
+        # Same checks as django.contrib.auth.get_user_model.
+        label = getattr(settings, 'PURGE_CHECKPOINT_MODEL', None)
+        if not label:
+            raise ImproperlyConfigured(
+                "purge() needs PURGE_CHECKPOINT_MODEL, e.g. 'rest_auth.PurgeCheckpoint'"
+            )
+        try:
+            return apps.get_model(label, require_ready=False)
+        except ValueError:
+            raise ImproperlyConfigured("PURGE_CHECKPOINT_MODEL must be of the form 'app_label.model_name'")
+        except LookupError:
+            raise ImproperlyConfigured(
+                "PURGE_CHECKPOINT_MODEL refers to model '%s' that has not been installed" % label
+            )
+
+    def stats(self):
+        """Live/deleted row counts and, on PostgreSQL, the table size on disk."""
+        queryset = SoftDeleteQuerySet(self.model, using=self._db)
+        stats = queryset.aggregate(
+            total=Count('pk'),
+            deleted=Count('pk', filter=Q(is_deleted=True)),
+            oldest_deleted_at=Min('deleted_at'),
+        )
+        stats['live'] = stats['total'] - stats['deleted']
+        stats['deleted_ratio'] = stats['deleted'] / stats['total'] if stats['total'] else 0.0
+
+        stats['table_bytes'] = None
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_total_relation_size(%s)', [self.model._meta.db_table])
+                stats['table_bytes'] = cursor.fetchone()[0]
+        return stats
+
+    def explain(self, trash=False, **options):
+        """Query plan of the live (or trash) listing, to check the partial indexes are used."""
+        queryset = self.trash() if trash else self.get_queryset().order_by('pk')
+        return queryset.explain(**options)
@@ -1,20 +1,34 @@
 import inspect
+import time
 import uuid
 from functools import partial
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import RegexValidator
-from django.db import models, transaction
+from django.db import IntegrityError, models, transaction
+from django.db.backends.utils import names_digest
 from django.utils import timezone
-from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
-from rest_framework.serializers import ModelSerializer
 
-from config.utils.managers import SignalsManager, SoftDeleteSignalsManager
-from config.utils.utils import generate_random_code
+from config.utils.cache import shared_cache
+from config.utils.codes import code_pool
+from config.utils.managers import CodeQuerySet, SignalsManager, SoftDeleteSignalsManager
+from config.utils.utils import generate_random_code, generate_uuid
 
 generate_code = partial(generate_random_code, length=8)
 
 
+_singletons = {}
+
+
+def _copy_instance(instance):
+    # Same state copy as pickling, without looking the model up again.
+    clone = instance.__class__.__new__(instance.__class__)
+    clone.__dict__.update(instance.__getstate__())
+    return clone
+
+
 class SingletonModel(models.Model):
     updated = models.DateTimeField(editable=False, auto_now=True)
 
@@ -24,21 +38,65 @@ class SingletonModel(models.Model):
     def save(self, *args, **kwargs):
         self.pk = 1
         super(SingletonModel, self).save(*args, **kwargs)
+        # A rolled back save must not reach other callers.
+        transaction.on_commit(_copy_instance(self).publish, using=kwargs.get('using'))
 
     def delete(self, *args, **kwargs):
         pass
 
+    @classmethod
+    def get_cache_key(cls, version=None):
+        label = cls._meta.label_lower
+        if version is None:
+            return 'singleton:{}:version'.format(label)
+        return 'singleton:{}:{}'.format(label, version)
+
+    def publish(self):
+        """Share this copy through the cache under a new version, other
+        workers drop theirs on their next version check."""
+        version = uuid.uuid4().hex
+        timeout = getattr(settings, 'SINGLETON_CACHE_TIMEOUT', None)
+        cache.set(self.get_cache_key(version), self, timeout)
+        shared_cache.set(self.get_cache_key(), version, timeout)
+        _singletons[self._meta.label_lower] = [
+            _copy_instance(self), version, time.monotonic() + self.get_recheck_interval(),
+        ]
+
+    @staticmethod
+    def get_recheck_interval():
+        return getattr(settings, 'SINGLETON_CACHE_RECHECK', 1.0)
+
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        """Each caller gets its own copy; changes to it are only shared
+        once saved."""
+        label = cls._meta.label_lower
+        entry = _singletons.get(label)
+        now = time.monotonic()
+        if entry is not None and now < entry[2]:
+            return _copy_instance(entry[0])
+
+        version = shared_cache.get(cls.get_cache_key())
+        if entry is not None and version == entry[1]:
+            entry[2] = now + cls.get_recheck_interval()
+            return _copy_instance(entry[0])
+
+        obj = cache.get(cls.get_cache_key(version)) if version is not None else None
+        if obj is None:
+            obj, created = cls.objects.get_or_create(pk=1)
+            if not created:
+                obj.publish()
+            return obj
+
+        _singletons[label] = [obj, version, now + cls.get_recheck_interval()]
+        return _copy_instance(obj)
 
 
 class Entity(models.Model):
     class Meta:
         abstract = True
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=generate_uuid, editable=False)
     created = models.DateTimeField(editable=False, auto_now_add=True)
     updated = models.DateTimeField(editable=False, auto_now=True)
 
@@ -55,7 +113,33 @@ class UUIDPrimaryKeyField(models.UUIDField):
         value = super().pre_save(model_instance, add)
 
         if value is None:
-            value = uuid.uuid4()
+            value = generate_uuid()
+            setattr(model_instance, self.attname, value)
+
+        return value
+
+
+class CodeField(models.CharField):
+    """ Unique code drawn from the model's CodePool when left empty. """
+
+    def __init__(self, *args, length=8, **kwargs):
+        kwargs.setdefault('max_length', 32)
+        kwargs.setdefault('blank', True)
+        kwargs['unique'] = True
+        self.length = length
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.length != 8:
+            kwargs['length'] = self.length
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+
+        if not value:
+            value = code_pool(model_instance.__class__, self.attname, self.length).take()
             setattr(model_instance, self.attname, value)
 
         return value
@@ -78,36 +162,135 @@ class ActiveModel(models.Model):
 
 
 class CodeModel(models.Model):
-    code = models.CharField(
-        max_length=32,
-        default=generate_code,
-        verbose_name=_('Model code'),
-        unique=True,
-    )
+    """ Models mixing this with SignalsModel should declare
+    ``objects = SignalsManager.from_queryset(CodeQuerySet)()`` to keep the
+    collision retry on bulk inserts.
+    """
+    code = CodeField(verbose_name=_('Model code'))
+
+    objects = CodeQuerySet.as_manager()
+
+    code_retries = 3
 
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding or self.code:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(self.code_retries):
+            try:
+                with transaction.atomic(using=kwargs.get('using')):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Only a pooled code taken by another process is retried.
+                taken = type(self)._default_manager.filter(code=self.code).exists()
+                if not taken or attempt == self.code_retries - 1:
+                    raise
+                self.code = ''
+
+
+def datetime_representation(value):
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def iso_representation(value):
+    return value.isoformat()
+
+
+# Same output as the DRF fields ModelSerializer would build for these columns.
+FIELD_REPRESENTATIONS = {
+    'UUIDField': str,
+    'DateTimeField': datetime_representation,
+    'DateField': iso_representation,
+    'TimeField': iso_representation,
+}
+# Columns whose DRF representation is not a plain value.
+SERIALIZER_ONLY_FIELDS = {'BinaryField', 'DecimalField', 'DurationField', 'FileField', 'FilePathField', 'ImageField'}
+
 
 class SerializerModel(BaseModel):
 
-    @cached_property
+    @classmethod
+    def get_serializer_class(cls):
+        serializer_class = cls.__dict__.get('_serializer_class')
+        if serializer_class is None:
+            from rest_framework.serializers import ModelSerializer
+
+            class SelfSerializer(ModelSerializer):
+                class Meta:
+                    model = cls
+                    fields = '__all__'
+
+            serializer_class = cls._serializer_class = SelfSerializer
+        return serializer_class
+
+    @classmethod
+    def get_serialize_plan(cls):
+        """(name, attname, representation) per serialized column, or None when DRF is needed."""
+        if '_serialize_plan' not in cls.__dict__:
+            cls._serialize_plan = cls._build_serialize_plan()
+        return cls._serialize_plan
+
+    @classmethod
+    def _build_serialize_plan(cls):
+        opts = cls._meta
+        if opts.many_to_many:
+            return None
+
+        # ModelSerializer order: pk, plain columns, then forward relations.
+        columns = [field for field in opts.concrete_fields if field.serialize and field is not opts.pk]
+        fields = [opts.pk] + [field for field in columns if not field.remote_field] + \
+                 [field for field in columns if field.remote_field]
+
+        plan = []
+        for field in fields:
+            target = field.target_field if field.remote_field else field
+            internal_type = target.get_internal_type()
+            if internal_type in SERIALIZER_ONLY_FIELDS:
+                return None
+            plan.append((field.name, field.attname, FIELD_REPRESENTATIONS.get(internal_type)))
+        return tuple(plan)
+
+    @property
     def serializer(self):
-        class SelfSerializer(ModelSerializer):
-            class Meta:
-                pass
+        return self.get_serializer_class()
 
-        SelfSerializer.Meta.model = self
-        SelfSerializer.Meta.fields = '__all__'
-        return SelfSerializer
+    @staticmethod
+    def represent(plan, values):
+        data = {}
+        for (name, attname, representation), value in zip(plan, values):
+            data[name] = value if representation is None or value is None else representation(value)
+        return data
 
     def serialize(self):
-        data = self.serializer(self).data
+        plan = self.get_serialize_plan()
+        if plan is None:
+            # Related UUID keys stay UUIDs; the API renderers encode them.
+            return self.serializer(self).data
+        return self.represent(plan, [getattr(self, attname) for name, attname, representation in plan])
 
-        for key, value in data.items():
-            if isinstance(value, uuid.UUID):
-                data[key] = str(value)
-        return data
+    @classmethod
+    def serialize_many(cls, queryset=None, chunk_size=2000):
+        """Stream serialized rows; plain models are read through values()."""
+        queryset = cls._default_manager.all() if queryset is None else queryset
+        plan = cls.get_serialize_plan()
+
+        if plan is None:
+            serializer_class = cls.get_serializer_class()
+            for obj in queryset.iterator(chunk_size=chunk_size):
+                yield serializer_class(obj).data
+            return
+
+        attnames = [attname for name, attname, representation in plan]
+        for row in queryset.values_list(*attnames).iterator(chunk_size=chunk_size):
+            yield cls.represent(plan, row)
 
     class Meta:
         abstract = True
@@ -139,6 +322,9 @@ class UUIDModel(BaseModel):
         abstract = True
 
 
+EVENT_NAMES = ('pre_save', 'post_save', 'pre_delete', 'post_delete')
+
+
 class SignalsModel(SerializerModel):
     SOFT_DELETE = False
 
@@ -157,12 +343,39 @@ class SignalsModel(SerializerModel):
         context.update(kwargs)
         return context
 
+    @classmethod
+    def get_event_hooks(cls, event_name):
+        # Built once per concrete class; kept in the class' own __dict__ so
+        # subclasses never reuse a parent's registry.
+        registry = cls.__dict__.get('_event_hooks')
+        if registry is None:
+            registry = {event: [] for event in EVENT_NAMES}
+            for attribute in dir(cls):
+                event = next((event for event in EVENT_NAMES if attribute.startswith(event)), None)
+                if event is None:
+                    continue
+                # What is a bound method on an instance: plain methods and
+                # classmethods, but not staticmethods.
+                member = getattr(cls, attribute, None)
+                static = isinstance(inspect.getattr_static(cls, attribute, None), staticmethod)
+                if (inspect.isfunction(member) and not static) or inspect.ismethod(member):
+                    registry[event].append(attribute)
+            registry = {event: tuple(hooks) for event, hooks in registry.items()}
+            cls._event_hooks = registry
+        return registry[event_name]
+
     def trigger_event(self, event_name, context):
-        for attribute in dir(self):
-            if attribute.startswith(event_name):
-                method = getattr(self, attribute)
-                if inspect.ismethod(method):
-                    method(context)
+        for attribute in self.get_event_hooks(event_name):
+            getattr(self, attribute)(context)
+
+    @classmethod
+    def trigger_bulk_event(cls, event_name, objs, contexts):
+        hooks = cls.get_event_hooks(event_name)
+        if not hooks:
+            return
+        for obj, context in zip(objs, contexts):
+            for attribute in hooks:
+                getattr(obj, attribute)(context)
 
     def save(self, *args, **kwargs):
         force_insert = kwargs.get('force_insert', False)
@@ -189,6 +402,34 @@ class SignalsModel(SerializerModel):
             self.trigger_event('post_delete', context)
 
 
+class ModelIndex(models.Index):
+    """ Index for abstract models, named ``<app_label>_<class>_<suffix>`` on
+    each concrete subclass. Names over 30 characters are cut and given a hash
+    of the full name before the suffix, as Index.set_name_with_model does.
+    """
+
+    def __init__(self, *args, suffix=None, name=None, **kwargs):
+        self.name_suffix = suffix
+        super().__init__(*args, name=name or '%(app_label)s_%(class)s_{}'.format(suffix), **kwargs)
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if self.name_suffix and '%(' not in value and len(value) > self.max_name_length:
+            suffix = '_{}_{}'.format(names_digest(value, length=6), self.name_suffix)
+            value = value[:self.max_name_length - len(suffix)].rstrip('_') + suffix
+        self._name = value
+
+    def deconstruct(self):
+        path, args, kwargs = super().deconstruct()
+        if self.name_suffix:
+            kwargs['suffix'] = self.name_suffix
+        return path, args, kwargs
+
+
 class SoftDeleteSignalModel(SignalsModel):
     SOFT_DELETE = True
     deleted_at = models.DateTimeField(blank=True, null=True)
@@ -199,6 +440,15 @@ class SoftDeleteSignalModel(SignalsModel):
 
     class Meta:
         abstract = True
+        # Partial index matching the trash predicate trash() and purge()
+        # emit; subclasses with their own Meta should inherit from
+        # SoftDeleteSignalModel.Meta to keep it. Live-row queries are best
+        # served by subclass indexes on the columns they filter or order on,
+        # e.g. ModelIndex(fields=['-created'], suffix='live',
+        # condition=models.Q(is_deleted=False)).
+        indexes = [
+            ModelIndex(fields=['-deleted_at'], suffix='trash', condition=models.Q(is_deleted=True)),
+        ]
 
     def hard_delete(self):
         super().delete(hard_delete=True)
@@ -1,55 +1,690 @@
+import base64
+import binascii
+import calendar
+import copy
+import hashlib
+import heapq
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta
+from pathlib import Path
 
+from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.module_loading import import_string
 from ninja.security import HttpBearer
+from pydantic import ValidationError
 
+from .cache import shared_cache
+from .executors import run_db
+from .profiling import profile_section
 from .schemas import TokenAuth
 from django.conf import settings
-from jose import jwt, JWTError
+
+logger = logging.getLogger(__name__)
 
 ALGORITHM = "HS256"
 access_token_jwt_subject = "access"
+refresh_token_jwt_subject = "refresh"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+class TokenCodec:
+    """ Compact JWS encoding shared by every backend.
+
+    Subclasses set ``algorithm`` and implement ``sign``/``verify``;
+    ``signing_kid`` names the key written to the ``kid`` header.
+    """
+    algorithm = None
+
+    def signing_kid(self):
+        return None
+
+    def sign(self, signing_input: bytes, kid) -> bytes:
+        raise NotImplementedError
+
+    def verify(self, signing_input: bytes, signature: bytes, kid) -> bool:
+        raise NotImplementedError
+
+    def encode(self, payload: dict) -> str:
+        header = {'alg': self.algorithm, 'typ': 'JWT'}
+        kid = self.signing_kid()
+        if kid is not None:
+            header['kid'] = kid
+        signing_input = b'.'.join((
+            _b64encode(json.dumps(header, separators=(',', ':')).encode('utf-8')),
+            _b64encode(json.dumps(payload, separators=(',', ':'), default=_json_default).encode('utf-8')),
+        ))
+        return b'.'.join((signing_input, _b64encode(self.sign(signing_input, kid)))).decode('ascii')
+
+    def decode(self, token: str) -> dict:
+        try:
+            signing_input, _, signature = token.encode('ascii').rpartition(b'.')
+            header_segment, _, payload_segment = signing_input.partition(b'.')
+            header = json.loads(_b64decode(header_segment))
+            signature = _b64decode(signature)
+        except (ValueError, UnicodeError, binascii.Error):
+            raise InvalidToken('Malformed token')
+
+        if not isinstance(header, dict) or header.get('alg') != self.algorithm:
+            raise InvalidToken('Unexpected token algorithm')
+        if not self.verify(signing_input, signature, header.get('kid')):
+            raise InvalidToken('Signature verification failed')
+
+        try:
+            payload = json.loads(_b64decode(payload_segment))
+        except (ValueError, binascii.Error):
+            raise InvalidToken('Malformed token')
+        if not isinstance(payload, dict):
+            raise InvalidToken('Malformed token')
+        exp = payload.get('exp')
+        if exp is not None and (not isinstance(exp, (int, float)) or exp < time.time()):
+            raise InvalidToken('Token expired')
+        return payload
+
+
+class HMACCodec(TokenCodec):
+    """ HS256/384/512 with the keyed HMAC state computed once. """
+    DIGESTS = {'HS256': hashlib.sha256, 'HS384': hashlib.sha384, 'HS512': hashlib.sha512}
+
+    def __init__(self, secret, algorithm=ALGORITHM):
+        if algorithm not in self.DIGESTS:
+            raise ValueError('Unsupported HMAC algorithm {}'.format(algorithm))
+        self.algorithm = algorithm
+        key = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self._mac = hmac.new(key, digestmod=self.DIGESTS[algorithm])
+
+    def sign(self, signing_input, kid):
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def verify(self, signing_input, signature, kid):
+        return hmac.compare_digest(self.sign(signing_input, kid), signature)
+
+
+def _load_key(value, private):
+    """ PEM data, a path to a PEM file, or an already loaded key object. """
+    from cryptography.hazmat.primitives import serialization
+
+    if isinstance(value, Path) or (isinstance(value, str) and not value.lstrip().startswith('-----BEGIN')):
+        value = Path(value).read_bytes()
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    if not isinstance(value, bytes):
+        return value
+    if private:
+        return serialization.load_pem_private_key(value, password=None)
+    return serialization.load_pem_public_key(value)
+
+
+class AsymmetricCodec(TokenCodec):
+    """ RS256 or EdDSA (Ed25519) with key objects loaded once.
+
+    Tokens are signed with ``active_kid`` and verified with the public key
+    named by their ``kid`` header, so retired keys keep verifying the tokens
+    they signed while a new key is rolled out.
+    """
+    ALGORITHMS = ('RS256', 'EdDSA')
+
+    def __init__(self, algorithm, public_keys, private_keys=None, active_kid=None):
+        # cryptography is only loaded by workers that sign with key pairs.
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError('Unsupported asymmetric algorithm {}'.format(algorithm))
+        self._invalid_signature = InvalidSignature
+        self._padding = padding.PKCS1v15()
+        self._hash = hashes.SHA256()
+        self.algorithm = algorithm
+        self.public_keys = {kid: _load_key(key, private=False) for kid, key in public_keys.items()}
+        self.private_keys = {kid: _load_key(key, private=True) for kid, key in (private_keys or {}).items()}
+        self.active_kid = active_kid
+        for kid, private_key in self.private_keys.items():
+            self.public_keys.setdefault(kid, private_key.public_key())
+
+    def signing_kid(self):
+        return self.active_kid
+
+    def sign(self, signing_input, kid):
+        try:
+            key = self.private_keys[kid]
+        except KeyError:
+            raise InvalidToken('No private key for kid {!r}'.format(kid))
+        if self.algorithm == 'RS256':
+            return key.sign(signing_input, self._padding, self._hash)
+        return key.sign(signing_input)
+
+    def verify(self, signing_input, signature, kid):
+        key = self.public_keys.get(kid)
+        if key is None:
+            return False
+        try:
+            if self.algorithm == 'RS256':
+                key.verify(signature, signing_input, self._padding, self._hash)
+            else:
+                key.verify(signature, signing_input)
+        except (self._invalid_signature, TypeError, ValueError):
+            return False
+        return True
+
+
+_token_codec = None
+
+
+def build_token_codec():
+    codec_path = getattr(settings, 'JWT_CODEC', None)
+    if codec_path:
+        return import_string(codec_path)()
+
+    algorithm = getattr(settings, 'JWT_ALGORITHM', ALGORITHM)
+    if algorithm in HMACCodec.DIGESTS:
+        return HMACCodec(settings.SECRET_KEY, algorithm)
+    return AsymmetricCodec(
+        algorithm,
+        public_keys=getattr(settings, 'JWT_PUBLIC_KEYS', {}),
+        private_keys=getattr(settings, 'JWT_PRIVATE_KEYS', {}),
+        active_kid=getattr(settings, 'JWT_ACTIVE_KID', None),
+    )
+
+
+def get_token_codec():
+    global _token_codec
+    if _token_codec is None:
+        _token_codec = build_token_codec()
+    return _token_codec
+
+
+def reset_token_codec(setting, **kwargs):
+    global _token_codec
+    if setting == 'SECRET_KEY' or setting.startswith('JWT_'):
+        _token_codec = None
+
+
+setting_changed.connect(reset_token_codec)
+
+
+def _db_datetime(timestamp):
+    value = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return value if settings.USE_TZ else timezone.make_naive(value)
+
+
+class RevocationStore:
+    """ Revoked session ids -> expiry, mirrored from the DB.
+
+    Entries only live as long as an access token, so the store holds the
+    sessions revoked in the last few minutes. ``is_revoked`` is a dict
+    lookup. A daemon thread pulls ids revoked by other workers every
+    ``sync_interval`` seconds, drops expired ids through an expiry heap and
+    deletes expired revocation and session rows every ``sweep_interval``
+    seconds.
+    """
+    SYNC_OVERLAP = 60
+
+    def __init__(self, sync_interval=5.0, sweep_interval=3600.0):
+        self.sync_interval = sync_interval
+        self.sweep_interval = sweep_interval
+        self._expires = {}
+        self._heap = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._watermark = None
+        self._swept_at = 0.0
+
+    @property
+    def model(self):
+        return apps.get_model(getattr(settings, 'TOKEN_REVOCATION_MODEL', 'rest_auth.RevokedToken'))
+
+    def is_revoked(self, *ids):
+        self._ensure_running()
+        now = time.time()
+        return any(self._expires.get(id_, 0) > now for id_ in ids if id_)
+
+    def revoke(self, id_, expires_at):
+        """ Revoke ``id_`` until the unix time ``expires_at``; False if it already was. """
+        self._remember(id_, expires_at)
+        _, created = self.model.objects.get_or_create(jti=id_, defaults={'expires_at': _db_datetime(expires_at)})
+        return created
+
+    def _remember(self, id_, expires_at):
+        with self._lock:
+            self._drop_expired(time.time())
+            if expires_at > self._expires.get(id_, 0):
+                self._expires[id_] = expires_at
+                heapq.heappush(self._heap, (expires_at, id_))
+
+    def _drop_expired(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, id_ = heapq.heappop(self._heap)
+            if self._expires.get(id_) == expires_at:
+                del self._expires[id_]
+
+    def sync(self):
+        rows = self.model.objects.filter(expires_at__gt=timezone.now())
+        if self._watermark is not None:
+            # Rows committed late can carry an older revoked_at.
+            rows = rows.filter(revoked_at__gte=self._watermark - timedelta(seconds=self.SYNC_OVERLAP))
+        for jti, expires_at, revoked_at in rows.values_list('jti', 'expires_at', 'revoked_at').iterator():
+            self._remember(jti, expires_at.timestamp())
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            self._drop_expired(now)
+        if now - self._swept_at >= self.sweep_interval:
+            self._swept_at = now
+            self.model.objects.filter(expires_at__lte=timezone.now()).delete()
+            session_model().objects.filter(expires_at__lte=timezone.now()).delete()
+
+    def _ensure_running(self):
+        if self._thread is not None or self.sync_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='token-revocations', daemon=True)
+                self._thread.start()
+
+    def run_once(self):
+        close_old_connections()
+        try:
+            self.sync()
+            self.sweep()
+        except Exception:
+            # Keep serving from memory; the next pass retries.
+            logger.exception('Token revocation sync failed')
+        finally:
+            close_old_connections()
+
+    def _run(self):
+        while True:
+            self.run_once()
+            time.sleep(self.sync_interval)
+
+    def _after_fork(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._expires)
+
+
+revocation_store = RevocationStore(
+    sync_interval=getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 5.0),
+    sweep_interval=getattr(settings, 'TOKEN_REVOCATION_SWEEP_INTERVAL', 3600.0),
+)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=revocation_store._after_fork)
+
+
+class TokenCache:
+    """ Bounded LRU of verified tokens -> user snapshots.
+
+    Entries expire with the token ``exp`` and are checked against the
+    revocation store (by session id) on every hit. Saving or deleting the
+    owning user drops its entries here and bumps the user's version in the
+    shared ``versions`` cache, which every hit compares with the version the
+    entry was stored under, so other workers drop theirs too.
+    """
+
+    def __init__(self, max_size=1024, revocations=None, versions=None):
+        self.max_size = max_size
+        self.revocations = revocations
+        self.versions = versions
+        self._entries = OrderedDict()
+        self._tokens_by_user = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user, revocation_ids, version = entry
+            if expires_at <= time.time():
+                self._discard(token)
+                return None
+            self._entries.move_to_end(token)
+        if self.revocations is not None and self.revocations.is_revoked(*revocation_ids):
+            return None
+        if self.user_version(user.pk) != version:
+            with self._lock:
+                if self._entries.get(token) is entry:
+                    self._discard(token)
+            return None
+        return copy.copy(user)
+
+    def set(self, token, expires_at, user, revocation_ids=(), version=None):
+        """ ``version`` is ``user_version()`` read before ``user`` was loaded. """
+        with self._lock:
+            self._discard(token)
+            self._entries[token] = (expires_at, copy.copy(user), tuple(revocation_ids), version)
+            self._tokens_by_user[str(user.pk)].add(token)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    @staticmethod
+    def version_key(user_id):
+        return 'token-user:{}:version'.format(user_id)
+
+    def user_version(self, user_id):
+        if self.versions is None:
+            return None
+        return self.versions.get(self.version_key(user_id))
 
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(str(user_id), ())):
+                self._discard(token)
+        if self.versions is not None:
+            self.versions.set(self.version_key(user_id), uuid.uuid4().hex, None)
 
-def create_access_token(*, data: dict, expires_delta: timedelta = None):
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _discard(self, token):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        user_id = str(entry[1].pk)
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache(max_size=getattr(settings, 'TOKEN_CACHE_SIZE', 1024), revocations=revocation_store,
+                         versions=shared_cache)
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+post_save.connect(invalidate_cached_user, sender=settings.AUTH_USER_MODEL)
+post_delete.connect(invalidate_cached_user, sender=settings.AUTH_USER_MODEL)
+
+
+def create_access_token(*, data: dict, expires_delta: timedelta = None, subject: str = access_token_jwt_subject):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire, "sub": access_token_jwt_subject})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "sub": subject, "jti": uuid.uuid4().hex})
+    return get_token_codec().encode(to_encode)
 
 
-def create_token(user_id):
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+def user_claims(user):
+    """ Claims a TokenPrincipal is built from, besides the id
+    """
+    return {"is_staff": user.is_staff, "is_verified": getattr(user, "is_verified", False)}
+
+
+def access_token_lifetime():
+    return timedelta(minutes=getattr(settings, 'ACCESS_TOKEN_EXPIRE_MINUTES', 15))
+
+
+def refresh_token_lifetime():
+    return timedelta(days=getattr(settings, 'REFRESH_TOKEN_EXPIRE_DAYS', 30))
+
+
+def session_model():
+    return apps.get_model(getattr(settings, 'TOKEN_SESSION_MODEL', 'rest_auth.TokenSession'))
+
+
+def create_token(user_id, sid: str = None, generation: int = 0, **claims):
+    """ Access/refresh pair for one session; ``sid`` is kept across refreshes.
+    Without ``sid`` a new session is started, which writes its row.
+    """
+    if sid is None:
+        sid = uuid.uuid4().hex
+        session_model().objects.create(sid=sid, user_id=str(user_id),
+                                       expires_at=timezone.now() + refresh_token_lifetime())
+    data = {"id": str(user_id), "sid": sid}
     return {
         "access_token": create_access_token(
-            data={"id": str(user_id)}, expires_delta=access_token_expires
+            data={**data, **claims}, expires_delta=access_token_lifetime()
+        ),
+        "refresh_token": create_access_token(
+            data={**data, "gen": generation}, expires_delta=refresh_token_lifetime(),
+            subject=refresh_token_jwt_subject
         ),
         "token_type": "bearer",
     }
 
 
-def get_current_user(token: str):
-    """ Check auth user
+def decode_token(token: str, subject: str):
+    """ Verify the token signature, expiry and subject, return its claims
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        token_data = TokenAuth(**payload)
-    except JWTError:
+        token_data = TokenAuth(**get_token_codec().decode(token))
+    except (InvalidToken, ValidationError):
+        return None
+    if token_data.sub != subject:
+        return None
+    return token_data
+
+
+def decode_access_token(token: str):
+    """ Claims of a valid access token whose session has not been revoked
+    """
+    token_data = decode_token(token, access_token_jwt_subject)
+    if token_data is None or revocation_store.is_revoked(token_data.sid):
+        return None
+    return token_data
+
+
+def rotate_refresh_token(token: str):
+    """ Exchange a refresh token for a new pair, bumping the session generation.
+
+    Presenting an older generation (an already rotated refresh token)
+    revokes the whole session, since either the client or an attacker
+    holds a stale copy.
+    """
+    token_data = decode_token(token, refresh_token_jwt_subject)
+    if token_data is None or not token_data.sid or token_data.gen is None:
+        return None
+
+    user = get_user_model().objects.filter(id=token_data.id, is_active=True).first()
+    if user is None:
         return None
 
-    token_exp = datetime.fromtimestamp(int(token_data.exp))
-    if token_exp < datetime.utcnow():
+    sessions = session_model().objects.filter(sid=token_data.sid, revoked_at__isnull=True)
+    rotated = sessions.filter(generation=token_data.gen).update(
+        generation=F('generation') + 1, expires_at=timezone.now() + refresh_token_lifetime()
+    )
+    if not rotated:
+        if sessions.exists():
+            revoke_session(token_data.sid)
+        return None
+    return create_token(user.pk, sid=token_data.sid, generation=token_data.gen + 1, **user_claims(user))
+
+
+def revoke_session(sid: str):
+    """ Refuse the session's refresh tokens from now on, and its access
+    tokens until the last one issued has expired
+    """
+    if sid:
+        session_model().objects.filter(sid=sid, revoked_at__isnull=True).update(revoked_at=timezone.now())
+        revocation_store.revoke(sid, int(time.time() + access_token_lifetime().total_seconds()))
+
+
+def revoke_refresh_token(refresh_token: str):
+    token_data = decode_token(refresh_token, refresh_token_jwt_subject)
+    if token_data is None:
+        return False
+    revoke_session(token_data.sid)
+    return True
+
+
+def load_token_user(token: str, token_data: TokenAuth):
+    version = token_cache.user_version(token_data.id)
+    user = get_object_or_404(get_user_model(), id=token_data.id)
+    token_cache.set(token, int(token_data.exp), user, (token_data.sid,), version)
+    return user
+
+
+def cached_token_user(token: str, token_data: TokenAuth):
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+    return load_token_user(token, token_data)
+
+
+def get_current_user(token: str):
+    """ Check auth user
+    """
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
+    token_data = decode_access_token(token)
+    if token_data is None:
         return None
 
-    return get_object_or_404(get_user_model(), id=token_data.id)
+    return load_token_user(token, token_data)
+
+
+class TokenPrincipal:
+    """ Request user built from the token claims alone.
+
+    ``id``, ``pk``, ``is_staff`` and ``is_verified`` never touch the
+    database; any other attribute loads the account on first access (use
+    ``aload`` from async code). Claims are as fresh as the token.
+    """
+    __slots__ = ('id', 'is_staff', 'is_verified', '_token', '_token_data', '_user')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token: str, token_data: TokenAuth):
+        self.id = token_data.id
+        self.is_staff = token_data.is_staff
+        self.is_verified = token_data.is_verified
+        self._token = token
+        self._token_data = token_data
+        self._user = None
+
+    @property
+    def pk(self):
+        return self.id
+
+    def load(self):
+        if self._user is None:
+            self._user = cached_token_user(self._token, self._token_data)
+        return self._user
+
+    async def aload(self):
+        if self._user is None:
+            self._user = await run_db(cached_token_user, self._token, self._token_data)
+        return self._user
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __repr__(self):
+        return '<TokenPrincipal {}>'.format(self.id)
+
+
+def get_token_principal(token: str):
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
+    token_data = decode_access_token(token)
+    if token_data is not None:
+        return TokenPrincipal(token, token_data)
 
 
 class AuthBearer(HttpBearer):
+    """ ``AuthBearer(stateless=True)`` authenticates from the token claims
+    and hands the handler a TokenPrincipal instead of loading the account.
+    """
+
+    def __init__(self, stateless: bool = False):
+        super().__init__()
+        self.stateless = stateless
+
+    def __call__(self, request):
+        with profile_section('auth'):
+            return super().__call__(request)
+
     def authenticate(self, request, token: str) -> get_user_model:
+        if self.stateless:
+            return get_token_principal(token)
+
         user = get_current_user(token)
         if user:
             return user
+
+
+class AsyncAuthBearer(HttpBearer):
+    """ Bearer auth for async operations.
+
+    Authentication callbacks run on the event loop, so this only checks
+    the signature and the in-memory revocations; ``aget_current_user``
+    consults token_cache (whose version check reads the shared cache) and
+    the database off the loop.
+    """
+
+    def __call__(self, request):
+        with profile_section('auth'):
+            return super().__call__(request)
+
+    def authenticate(self, request, token: str):
+        token_data = decode_access_token(token)
+        if token_data is not None:
+            return TokenPrincipal(token, token_data)
+
+
+def get_request_user(request):
+    """ The account behind ``request.auth``, loading it for a TokenPrincipal. """
+    if isinstance(request.auth, TokenPrincipal):
+        request.auth = request.auth.load()
+    return request.auth
+
+
+async def aget_current_user(request):
+    if isinstance(request.auth, TokenPrincipal):
+        request.auth = await request.auth.aload()
+    return request.auth
@@ -0,0 +1,296 @@
+"""
+Sampling request profiler.
+
+``ProfilingMiddleware`` profiles the requests whose path starts with one of
+``PROFILING_ROUTES`` plus a random ``PROFILING_SAMPLE_RATE`` share of the
+rest. A profiled request records its SQL count and time, the time spent in
+``profile_section('auth')`` / ``profile_section('serialization')`` blocks and
+stack samples taken every ``PROFILING_INTERVAL`` seconds. Records go into a
+per-process ring buffer that is written to ``PROFILING_RESULT_PATH`` as
+``<pid>.json`` and, aggregated, as ``<pid>.folded`` (flamegraph.pl /
+speedscope input). ``manage.py profile_report`` summarizes them.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack, contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+
+MAX_STACK_DEPTH = 128
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    __slots__ = ('thread_id', 'started', 'sql_count', 'sql_time', 'timings', 'stacks', 'lock')
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.timings = Counter()
+        self.stacks = Counter()
+        self.lock = threading.Lock()
+
+    def add_time(self, section, seconds):
+        with self.lock:
+            self.timings[section] += seconds
+
+
+@contextmanager
+def profile_section(name):
+    """ Add the time spent in the block to the current request profile, if any. """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_time(name, time.perf_counter() - started)
+
+
+def _record_query(profile, execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        with profile.lock:
+            profile.sql_count += 1
+            profile.sql_time += elapsed
+
+
+@contextmanager
+def record_queries():
+    """ Count the queries this thread runs into the current request profile.
+
+    Connections are per thread, so run_db enters this too for ORM calls it
+    makes on behalf of async handlers. Without a profile it does nothing.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(partial(_record_query, profile)))
+        yield
+
+
+def fold_stack(frame):
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append('{}:{}'.format(frame.f_globals.get('__name__', code.co_filename), code.co_name))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """ One daemon thread sampling the threads that serve profiled requests.
+
+    Requests sharing a thread (async handlers on one event loop) each get
+    every sample taken from it while they are in flight.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles.setdefault(profile.thread_id, set()).add(profile)
+            self._active.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+
+    def discard(self, profile):
+        with self._lock:
+            profiles = self._profiles.get(profile.thread_id)
+            if profiles is not None:
+                profiles.discard(profile)
+                if not profiles:
+                    del self._profiles[profile.thread_id]
+            if not self._profiles:
+                self._active.clear()
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                targets = [(thread_id, list(profiles)) for thread_id, profiles in self._profiles.items()]
+            frames = sys._current_frames()
+            for thread_id, profiles in targets:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = fold_stack(frame)
+                for profile in profiles:
+                    with profile.lock:
+                        profile.stacks[stack] += 1
+
+    def _after_fork(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+
+class ProfileBuffer:
+    """ Last ``size`` request records plus stack counts aggregated per process. """
+
+    def __init__(self, size=1000, path='profile/', flush_interval=10.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._records = deque(maxlen=size)
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def add(self, record, stacks):
+        with self._lock:
+            self._records.append(record)
+            self._stacks.update(stacks)
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+            if due:
+                self._flushed_at = time.monotonic()
+        if due:
+            self.flush()
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def folded(self):
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return ''.join('{} {}\n'.format(stack, count) for stack, count in stacks)
+
+    def flush(self):
+        os.makedirs(self.path, exist_ok=True)
+        base = os.path.join(self.path, str(os.getpid()))
+        _write_atomic(base + '.json', json.dumps(self.records()))
+        _write_atomic(base + '.folded', self.folded())
+
+    def _after_fork(self):
+        self._records.clear()
+        self._stacks.clear()
+        self._lock = threading.Lock()
+
+
+def _write_atomic(path, content):
+    tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+    with open(tmp_path, 'w') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+sampler = StackSampler(interval=getattr(settings, 'PROFILING_INTERVAL', 0.005))
+buffer = ProfileBuffer(
+    size=getattr(settings, 'PROFILING_BUFFER_SIZE', 1000),
+    path=getattr(settings, 'PROFILING_RESULT_PATH', 'profile/'),
+    flush_interval=getattr(settings, 'PROFILING_FLUSH_INTERVAL', 10.0),
+)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=sampler._after_fork)
+    os.register_at_fork(after_in_child=buffer._after_fork)
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return '/' + match.route
+
+
+class ProfilingMiddleware:
+    """ Profile selected requests; every other request costs one random() call
+    and runs its queries without an execute wrapper.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.routes = tuple(getattr(settings, 'PROFILING_ROUTES', ()))
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def should_profile(self, request):
+        if self.routes and request.path.startswith(self.routes):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profile = self.start()
+        token = _current.set(profile)
+        try:
+            with record_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            sampler.discard(profile)
+        self.finish(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_profile(request):
+            return await self.get_response(request)
+
+        profile = self.start()
+        token = _current.set(profile)
+        try:
+            with record_queries():
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+            sampler.discard(profile)
+        self.finish(request, response, profile)
+        return response
+
+    def start(self):
+        profile = RequestProfile(threading.get_ident())
+        sampler.add(profile)
+        return profile
+
+    def finish(self, request, response, profile):
+        duration = time.perf_counter() - profile.started
+        with profile.lock:
+            record = {
+                'endpoint': endpoint_name(request),
+                'method': request.method,
+                'status': response.status_code,
+                'started': time.time() - duration,
+                'duration': duration,
+                'sql_count': profile.sql_count,
+                'sql_time': profile.sql_time,
+                'auth_time': profile.timings['auth'],
+                'serialization_time': profile.timings['serialization'],
+                'samples': sum(profile.stacks.values()),
+            }
+            stacks = dict(profile.stacks)
+        buffer.add(record, stacks)
@@ -0,0 +1,87 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+
+_projections = {}
+
+
+def _nested_schema(field):
+    type_ = field.type_
+    return type_ if isinstance(type_, type) and issubclass(type_, BaseModel) else None
+
+
+def item_schema(schema):
+    """
+    Description:The row schema of a list wrapper such as ``Paginated``
+    (its ``data: List[Schema]`` field), else ``schema`` itself.\n
+    """
+    field = schema.__fields__.get('data')
+    if field is not None and field.shape != SHAPE_SINGLETON and _nested_schema(field):
+        return field.type_
+    return schema
+
+
+def _build_projection(schema, model, prefix=''):
+    only, select_related, prefetch_related = [], [], []
+    for field in schema.__fields__.values():
+        try:
+            model_field = model._meta.get_field(field.alias)
+        except FieldDoesNotExist:
+            if field.alias == 'pk':
+                continue
+            # A property or method may read any column; keep the full row.
+            return None
+
+        nested = _nested_schema(field)
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch_related.append(prefix + model_field.name)
+        elif model_field.is_relation and nested is not None:
+            projection = _build_projection(nested, model_field.related_model, prefix + model_field.name + '__')
+            if projection is None:
+                return None
+            if model_field.concrete:
+                # select_related needs the foreign key column itself.
+                only.append(prefix + model_field.name)
+            select_related.append(prefix + model_field.name)
+            only.extend(projection[0])
+            select_related.extend(projection[1])
+            prefetch_related.extend(projection[2])
+        elif model_field.concrete:
+            only.append(prefix + model_field.name)
+        else:
+            return None
+    return only, select_related, prefetch_related
+
+
+def schema_projection(schema, model):
+    """
+    Description:(only, select_related, prefetch_related) that load exactly
+    the columns ``schema`` reads from ``model`` rows, nested schemas
+    included; None when a field is not a model field.\n
+    """
+    key = (schema, model)
+    if key not in _projections:
+        _projections[key] = _build_projection(item_schema(schema), model)
+    return _projections[key]
+
+
+def project(queryset, schema, extra_fields=()):
+    """
+    Description:Restrict ``queryset`` (or a manager) to what ``schema``
+    serializes, for single objects (``project(qs, AccountOut).get(...)``)
+    and lists alike. ``extra_fields`` are loaded as well, e.g. the ordering
+    a cursor is built from.\n
+    """
+    if not isinstance(queryset, QuerySet):
+        queryset = queryset.all()
+    projection = schema_projection(schema, queryset.model)
+    if projection is None:
+        return queryset
+
+    only, select_related, prefetch_related = projection
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset.only(*only, *extra_fields)
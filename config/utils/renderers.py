@@ -0,0 +1,103 @@
+from decimal import Decimal
+
+import orjson
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils.functional import Promise
+from ninja.parser import Parser
+from ninja.renderers import BaseRenderer, JSONRenderer
+from pydantic import BaseModel
+
+from .profiling import profile_section
+
+# UUID, datetime, date and time are encoded by orjson itself.
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def orjson_default(value):
+    if isinstance(value, Decimal):
+        # DRF's COERCE_DECIMAL_TO_STRING default, and ninja's encoder output.
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, Promise):
+        return str(value)
+    if isinstance(value, (QuerySet, set, frozenset, tuple)):
+        return list(value)
+    raise TypeError
+
+
+def dumps(data) -> bytes:
+    return orjson.dumps(data, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+class ProfiledJSONRenderer(JSONRenderer):
+    """ Ninja's JSON renderer, timed as serialization for profiled requests. """
+
+    def render(self, request, data, *, response_status):
+        with profile_section('serialization'):
+            return super().render(request, data, response_status=response_status)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    charset = 'utf-8'
+
+    def render(self, request, data, *, response_status):
+        with profile_section('serialization'):
+            return dumps(data)
+
+
+class ORJSONParser(Parser):
+
+    def parse_body(self, request):
+        return orjson.loads(request.body)
+
+
+def iter_json(data, schema=None, chunk_size=500):
+    """
+    Encode ``data`` piece by piece. Lists stay in memory; any other iterable
+    (a generator, ``QuerySet.iterator()``), at the top level or inside dicts,
+    is written ``chunk_size`` items at a time, each passed through ``schema``
+    when given.
+    """
+    if isinstance(data, dict):
+        yield b'{'
+        for index, (key, value) in enumerate(data.items()):
+            yield (b',' if index else b'') + dumps(str(key)) + b':'
+            yield from iter_json(value, schema, chunk_size)
+        yield b'}'
+    elif _is_stream(data):
+        yield b'['
+        chunk = []
+        first = True
+        for item in data:
+            chunk.append(schema.from_orm(item).dict() if schema is not None else item)
+            if len(chunk) >= chunk_size:
+                yield (b'' if first else b',') + dumps(chunk)[1:-1]
+                first, chunk = False, []
+        if chunk:
+            yield (b'' if first else b',') + dumps(chunk)[1:-1]
+        yield b']'
+    else:
+        yield dumps(data)
+
+
+def _is_stream(value):
+    return hasattr(value, '__iter__') and not isinstance(value, (list, tuple, str, bytes, dict, BaseModel))
+
+
+def stream_response(data, *, schema=None, status=200, chunk_size=500):
+    """
+    StreamingHttpResponse for large arrays, returned from a handler as is::
+
+        return stream_response({'total_count': count, 'data': qs.iterator()}, schema=AccountOut)
+
+    Ninja skips response validation for HttpResponse results, so ``schema``
+    is applied to each streamed item instead.
+    """
+    return StreamingHttpResponse(
+        iter_json(data, schema=schema, chunk_size=chunk_size),
+        status=status,
+        content_type='application/json; charset=utf-8',
+    )
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import json
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+from .cache import shared_cache
+from .executors import run_db
+from .profiling import profile_section
+from .renderers import dumps
+
+
+def auth_identity(request):
+    auth = getattr(request, 'auth', None)
+    if auth is None:
+        return 'anonymous'
+    return str(getattr(auth, 'pk', None) or getattr(auth, 'id', None) or auth)
+
+
+def _version_key(route, identity):
+    return 'response:{}:{}:version'.format(route, identity)
+
+
+def _entry_key(route, identity, version, request, kwargs):
+    params = json.dumps([sorted(request.GET.lists()), sorted(kwargs.items())], default=str)
+    return 'response:{}:{}:{}:{}'.format(
+        route, identity, version, hashlib.md5(params.encode('utf-8')).hexdigest()
+    )
+
+
+def render_json(data):
+    return dumps(data)
+
+
+def build_entry(schema, result):
+    status, data = result if isinstance(result, tuple) else (200, result)
+    if status != 200:
+        return None
+
+    with profile_section('serialization'):
+        body = render_json(schema.from_orm(data).dict())
+    updated = getattr(data, 'updated', None)
+    return {
+        'body': body,
+        'etag': quote_etag(hashlib.md5(body).hexdigest()),
+        'last_modified': http_date(updated.timestamp()) if updated else None,
+    }
+
+
+def not_modified(request, entry):
+    # If-None-Match takes precedence; If-Modified-Since only counts without it.
+    if 'If-None-Match' in request.headers:
+        etags = parse_etags(request.headers['If-None-Match'])
+        return entry['etag'] in etags or '*' in etags
+    if entry['last_modified'] and 'If-Modified-Since' in request.headers:
+        since = parse_http_date_safe(request.headers['If-Modified-Since'])
+        return since is not None and parse_http_date_safe(entry['last_modified']) <= since
+    return False
+
+
+def entry_response(request, entry):
+    if not_modified(request, entry):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry['body'], content_type='application/json; charset=utf-8')
+    response['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response['Last-Modified'] = entry['last_modified']
+    response['Cache-Control'] = 'private, no-cache'
+    response['Vary'] = 'Authorization'
+    return response
+
+
+def cache_response(schema, *, timeout=None):
+    """
+    Cache the serialized 200 body of a Ninja handler per route, auth identity
+    and query/path params. Responses carry ETag/Last-Modified, and a matching
+    If-None-Match is answered with 304 from the cached entry. Place it below
+    the router decorator; other status codes pass through untouched.
+    If-Modified-Since is honoured when the request has no If-None-Match.
+    """
+    def decorator(view_func):
+        route = '{}.{}'.format(view_func.__module__, view_func.__qualname__)
+        entry_timeout = timeout or getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+        def lookup(request, kwargs):
+            identity = auth_identity(request)
+            version = shared_cache.get(_version_key(route, identity)) or 0
+            key = _entry_key(route, identity, version, request, kwargs)
+            return key, cache.get(key)
+
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                key, entry = await run_db(lookup, request, kwargs)
+                if entry is None:
+                    result = await view_func(request, *args, **kwargs)
+                    entry = build_entry(schema, result)
+                    if entry is None:
+                        return result
+                    await run_db(cache.set, key, entry, entry_timeout)
+                return entry_response(request, entry)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                key, entry = lookup(request, kwargs)
+                if entry is None:
+                    result = view_func(request, *args, **kwargs)
+                    entry = build_entry(schema, result)
+                    if entry is None:
+                        return result
+                    cache.set(key, entry, entry_timeout)
+                return entry_response(request, entry)
+
+        wrapper.cache_route = route
+        return wrapper
+
+    return decorator
+
+
+def invalidate_cached_response(view_func, identity):
+    """Drop every cached entry of ``view_func`` (a cache_response handler) for one identity."""
+    shared_cache.set(_version_key(view_func.cache_route, str(identity)), uuid.uuid4().hex, None)
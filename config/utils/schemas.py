@@ -1,27 +1,87 @@
 from ninja import Schema
+from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
+
+_MISSING = object()
+
+
+def _has_nested_model(field):
+    return isinstance(field.type_, type) and issubclass(field.type_, BaseModel)
+
+
+class TrustedSchema(Schema):
+    """ Response schema for data that was validated when it was stored.
+
+    ``from_orm`` and ``validate`` build instances with ``construct()``:
+    values are taken as they are, without coercion or validation; nested
+    schema fields still go through their own ``validate``. A missing required
+    field raises ValidationError, as the validating constructor would. Only
+    use it for output, never for request bodies.
+    """
+
+    @classmethod
+    def validate(cls, value):
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls.construct_from(value)
+        return cls.from_orm(value)
+
+    @classmethod
+    def from_orm(cls, obj):
+        return cls.construct_from(cls.__config__.getter_dict(obj))
+
+    @classmethod
+    def construct_from(cls, source):
+        values = {}
+        for name, field in cls.__fields__.items():
+            value = source.get(field.alias, _MISSING)
+            if value is _MISSING:
+                if field.required:
+                    raise ValidationError([ErrorWrapper(MissingError(), loc=field.alias)], cls)
+                continue
+            if value is not None and _has_nested_model(field):
+                value, errors = field.validate(value, values, loc=field.alias, cls=cls)
+                if errors:
+                    raise ValidationError([errors], cls)
+            values[name] = value
+        return cls.construct(_fields_set=set(values), **values)
 
 
 class MessageOut(Schema):
     message: str
 
 
-class Token(Schema):
+class Token(TrustedSchema):
     access_token: str
+    refresh_token: str = None
     token_type: str
 
 
+class TokenRefreshIn(Schema):
+    refresh_token: str
+
+
 class TokenAuth(Schema):
     id: str
     exp: str
     sub: str
+    jti: str = None
+    sid: str = None
+    gen: int = None
+    is_staff: bool = False
+    is_verified: bool = False
 
 
 class Paginated(Schema):
-    total_count: int
+    total_count: int = None
     per_page: int
-    from_record: int
-    to_record: int
-    previous_page: int
-    current_page: int
-    next_page: int
-    page_count: int
+    from_record: int = None
+    to_record: int = None
+    previous_page: int = None
+    current_page: int = None
+    next_page: int = None
+    page_count: int = None
+    next_cursor: str = None
+    previous_cursor: str = None
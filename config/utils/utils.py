@@ -1,12 +1,28 @@
+import base64
 import hashlib
+import json
+import os
 import random
 import string
+import threading
 import time
-from datetime import datetime, timedelta
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from math import ceil
 
-from cryptography.fernet import Fernet
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from django.db.models.constants import LOOKUP_SEP
 from django.utils.crypto import get_random_string
+from django.utils.functional import cached_property
+
+from .projection import project
 
 ALLOWED_INT = '0123456789'
 
@@ -15,7 +31,45 @@ def create_random_key(size: int = 140) -> str:
     return ''.join(random.choices(string.ascii_letters + string.digits, k=size))
 
 
+_uuid7_lock = threading.Lock()
+_uuid7_last = [0, 0]  # unix ms, 12-bit sequence
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Description:Time-ordered UUID (version 7): 48-bit unix milliseconds, a
+    12-bit sequence that keeps ids from one process increasing within the
+    same millisecond, then 62 random bits.\n
+    """
+    with _uuid7_lock:
+        timestamp = time.time_ns() // 1_000_000
+        last_timestamp, sequence = _uuid7_last
+        if timestamp <= last_timestamp:
+            timestamp, sequence = last_timestamp, sequence + 1
+            if sequence > 0xFFF:
+                timestamp, sequence = timestamp + 1, 0
+        else:
+            sequence = random.getrandbits(11)
+        _uuid7_last[:] = timestamp, sequence
+
+    value = (timestamp & 0xFFFFFFFFFFFF) << 80 | 0x7 << 76 | sequence << 64 | 0b10 << 62
+    value |= int.from_bytes(os.urandom(8), 'big') & 0x3FFFFFFFFFFFFFFF
+    return uuid.UUID(int=value)
+
+
+def generate_uuid() -> uuid.UUID:
+    """
+    Description:Primary key default, uuid7() unless PRIMARY_KEY_UUID_VERSION
+    is set to 4.\n
+    """
+    if getattr(settings, 'PRIMARY_KEY_UUID_VERSION', 7) == 4:
+        return uuid.uuid4()
+    return uuid7()
+
+
 def create_random_encryption_key() -> bytes:
+    from cryptography.fernet import Fernet
+
     return Fernet.generate_key()
 
 
@@ -26,21 +80,18 @@ def random_string_generator(size=10, chars=ALLOWED_INT) -> str:
     return ''.join(random.choice(chars) for _ in range(size))
 
 
-def custom_key_generator(instance, size=6):
+def custom_key_generator(instance, size=6, field_name='key', candidates=10):
     """
-    Description:Generate a unique key for every instance passed.\n
+    Description:Generate a unique key for every instance passed, checking
+    ``candidates`` random keys per query.\n
     """
-    new_key = random_string_generator(size=size)
-
-    # get the class from the instance
-    Klass = instance.__class__
-
-    # qs_exists = Klass.objects.filter(key=new_key).exclude(is_active=True).exists()
-    qs_exists = Klass.objects.filter(key=new_key).exists()
-    if qs_exists:
-        return custom_key_generator(size=size)
-
-    return new_key
+    manager = instance.__class__._default_manager
+    while True:
+        keys = {random_string_generator(size=size) for _ in range(candidates)}
+        taken = manager.filter(**{'{}__in'.format(field_name): keys}).values_list(field_name, flat=True)
+        keys.difference_update(taken)
+        if keys:
+            return keys.pop()
 
 
 def generate_random_code(length=10):
@@ -61,11 +112,69 @@ def generate_datetime(min_year=1900, max_year=datetime.now().year):
     return start + (end - start) * random.random()
 
 
+def estimate_count(queryset):
+    """
+    Description:Row estimate from the PostgreSQL planner, exact count elsewhere.\n
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def cached_count(queryset, timeout=60):
+    sql, params = queryset.order_by().query.sql_with_params()
+    query = json.dumps([sql, params], cls=DjangoJSONEncoder, default=str)
+    key = 'count:{}'.format(hashlib.md5(query.encode('utf-8')).hexdigest())
+    return cache.get_or_set(key, queryset.count, timeout)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Description:Paginator counting with ``estimate_count``, for admin
+    changelists over large tables. Estimates under ``exact_threshold`` are
+    replaced by an exact count, so small result sets page precisely.\n
+    """
+    exact_threshold = 10000
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        estimate = estimate_count(self.object_list)
+        if estimate < self.exact_threshold and connections[self.object_list.db].vendor == 'postgresql':
+            return self.object_list.count()
+        return estimate
+
+
+COUNT_MODES = {
+    'exact': lambda queryset: queryset.count(),
+    'estimate': estimate_count,
+    'cached': cached_count,
+}
+
+
+def count_queryset(queryset, count=None):
+    if count is None:
+        return None
+    return COUNT_MODES[count](queryset)
+
+
 def paginated_response(queryset, *, per_page=10, page=1):
-    try:
-        total_count = len(queryset)
-    except TypeError:
-        total_count = 1
+    if isinstance(queryset, QuerySet):
+        total_count = queryset.count()
+    else:
+        try:
+            total_count = len(queryset)
+        except TypeError:
+            total_count = 1
     limit = per_page
     offset = per_page * (page - 1)
     page_count = ceil(total_count / per_page)
@@ -88,8 +197,162 @@ def paginated_response(queryset, *, per_page=10, page=1):
     }
 
 
-def response(status, data, *, paginated: bool = False, per_page: int = 10, page: int = 1):
+class InvalidCursor(ValueError):
+    pass
+
+
+# Cursor values keep their type and full precision: DjangoJSONEncoder cuts
+# datetimes to milliseconds, which moves the page boundary.
+CURSOR_TYPES = {
+    'datetime': (datetime, datetime.isoformat, datetime.fromisoformat),
+    'date': (date, date.isoformat, date.fromisoformat),
+    'decimal': (Decimal, str, Decimal),
+    'uuid': (uuid.UUID, str, uuid.UUID),
+}
+
+
+def _encode_cursor_value(value):
+    for name, (type_, encode, _) in CURSOR_TYPES.items():
+        if isinstance(value, type_):
+            return [name, encode(value)]
+    return value
+
+
+def _decode_cursor_value(value):
+    if isinstance(value, list):
+        name, raw = value
+        return CURSOR_TYPES[name][2](raw)
+    return value
+
+
+def encode_cursor(values, reverse=False):
+    payload = json.dumps({'v': [_encode_cursor_value(value) for value in values], 'r': reverse},
+                         cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return [_decode_cursor_value(value) for value in payload['v']], bool(payload['r'])
+    except (ValueError, KeyError, TypeError, ArithmeticError):
+        raise InvalidCursor('Invalid pagination cursor')
+
+
+def _cursor_ordering(queryset, ordering):
+    ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+    pk_name = queryset.model._meta.pk.name
+    if not any(field.lstrip('-') in ('pk', pk_name) for field in ordering):
+        ordering.append(pk_name)
+    return [field[:-2] + pk_name if field.lstrip('-') == 'pk' else field for field in ordering]
+
+
+def _is_nullable(model, name):
+    for part in name.split(LOOKUP_SEP):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            # An annotation; NULL handling is correct for non-null values too.
+            return True
+        if field.null or not field.concrete:
+            return True
+        if not field.is_relation:
+            return False
+        model = field.related_model
+    return False
+
+
+def _order_expression(field, nullable):
+    if not nullable:
+        return field
+    name = field.lstrip('-')
+    return F(name).desc(nulls_first=True) if field.startswith('-') else F(name).asc(nulls_last=True)
+
+
+def _keyset_filter(ordering, values, nullable):
+    """
+    Description:Rows after ``values`` in ``ordering``, NULL sorting above
+    every value in both directions (PostgreSQL's default).\n
+    """
+    condition, equal = Q(), Q()
+    for field, value, null in zip(ordering, values, nullable):
+        name = field.lstrip('-')
+        descending = field.startswith('-')
+        if value is None:
+            after = Q(**{name + '__isnull': False}) if descending else None
+        else:
+            after = Q(**{'{}__{}'.format(name, 'lt' if descending else 'gt'): value})
+            if null and not descending:
+                after |= Q(**{name + '__isnull': True})
+        if after is not None:
+            condition |= equal & after
+        equal &= Q(**{name + '__isnull': True}) if value is None else Q(**{name: value})
+    return condition
+
+
+def _row_values(row, ordering):
+    names = [field.lstrip('-') for field in ordering]
+    if isinstance(row, dict):
+        return [row[name] for name in names]
+    return [getattr(row, name) for name in names]
+
+
+def cursor_paginated_response(queryset, *, per_page=10, cursor=None, ordering=None, count=None):
+    """
+    Description:Keyset pagination, never counts or offsets unless asked to.\n
+    ``count`` is one of None, 'exact', 'estimate' or 'cached'. NULLs of
+    nullable ordering fields sort last ascending and first descending.
+    Raises InvalidCursor for a malformed ``cursor``.\n
+    """
+    ordering = _cursor_ordering(queryset, ordering)
+    values, reverse = decode_cursor(cursor) if cursor else (None, False)
+    if values is not None and len(values) != len(ordering):
+        raise InvalidCursor('Invalid pagination cursor')
+
+    nullable = [_is_nullable(queryset.model, field.lstrip('-')) for field in ordering]
+    page_ordering = [field[1:] if field.startswith('-') else '-' + field for field in ordering] \
+        if reverse else ordering
+    page_queryset = queryset.order_by(*map(_order_expression, page_ordering, nullable))
+    if values is not None:
+        page_queryset = page_queryset.filter(_keyset_filter(page_ordering, values, nullable))
+
+    data = list(page_queryset[:per_page + 1])
+    has_more = len(data) > per_page
+    data = data[:per_page]
+    if reverse:
+        data.reverse()
+
+    has_next = has_more if not reverse else values is not None
+    has_previous = (values is not None) if not reverse else has_more
+    next_cursor = encode_cursor(_row_values(data[-1], ordering)) if data and has_next else None
+    previous_cursor = encode_cursor(_row_values(data[0], ordering), reverse=True) \
+        if data and has_previous else None
+
+    total_count = count_queryset(queryset, count)
+    return {
+        'total_count': total_count,
+        'per_page': per_page,
+        'page_count': ceil(total_count / per_page) if total_count is not None else None,
+        'next_cursor': next_cursor,
+        'previous_cursor': previous_cursor,
+        'data': data,
+    }
+
+
+def response(status, data, *, paginated: bool = False, per_page: int = 10, page: int = 1,
+             cursor: str = None, ordering=None, count: str = None, schema=None):
+    """
+    Description:``schema`` (the declared response schema, or the row schema
+    of a paginated one) limits a QuerySet to the columns it serializes.\n
+    """
+    if schema is not None and isinstance(data, QuerySet):
+        extra_fields = [field.lstrip('-') for field in _cursor_ordering(data, ordering)] if paginated else ()
+        data = project(data, schema, extra_fields)
+
     if paginated:
-        return status, paginated_response(data, per_page, page)
+        if isinstance(data, QuerySet):
+            return status, cursor_paginated_response(data, per_page=per_page, cursor=cursor,
+                                                     ordering=ordering, count=count)
+        return status, paginated_response(data, per_page=per_page, page=page)
 
     return status, data
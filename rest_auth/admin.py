@@ -1,8 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from config.utils.utils import EstimatedCountPaginator
 from rest_auth.forms import UserAdminChangeForm, UserAdminCreationForm
 from rest_auth.models import EmailAccount
+from rest_auth.search import search_accounts
 
 
 class EmailAccountAdmin(BaseUserAdmin):
@@ -35,6 +37,15 @@ class EmailAccountAdmin(BaseUserAdmin):
     search_fields = ('first_name', 'last_name', 'email')
     ordering = ('email',)
     filter_horizontal = ()
+    # Bounded page loads at millions of accounts: planner estimates instead
+    # of COUNT(*), and no unfiltered total next to search results.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_accounts(queryset, search_term), False
 
 
 admin.site.register(EmailAccount, EmailAccountAdmin)
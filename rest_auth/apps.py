@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_search_index(using, **kwargs):
+    # Table rebuilds by SQLite migrations drop the FTS triggers and can
+    # renumber rows; recreate and refill the index if it is installed.
+    from django.db import connections
+
+    from rest_auth.search import has_search_index, install_search_index
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and has_search_index(connection):
+        install_search_index(connection)
 
 
 class RestAuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rest_auth'
+
+    def ready(self):
+        post_migrate.connect(restore_search_index, sender=self)
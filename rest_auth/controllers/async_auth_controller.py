@@ -0,0 +1,143 @@
+from http import HTTPStatus
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from ninja import Router
+
+from config.utils import hashing
+from config.utils.executors import run_db
+from config.utils.permissions import AsyncAuthBearer, aget_current_user, create_token, rotate_refresh_token, \
+    token_cache, user_claims, revoke_refresh_token
+from config.utils.projection import project
+from config.utils.response_cache import cache_response, invalidate_cached_response
+from config.utils.schemas import MessageOut, Token, TokenRefreshIn
+from config.utils.utils import response
+from rest_auth.models import EmailAccount
+from rest_auth.schemas.email_account_schemas import AccountSignupOut, AccountSignupIn, AccountSigninOut, \
+    AccountSigninIn, AccountOut, AccountUpdateIn, PasswordChangeIn
+
+async_auth_controller = Router(tags=['auth'])
+
+
+def _email_registered(email):
+    return EmailAccount.objects.filter_by_email(email).exists()
+
+
+def _create_account(payload, password):
+    user = EmailAccount(
+        email=EmailAccount.objects.normalize_email(payload.email),
+        first_name=payload.first_name,
+        last_name=payload.last_name,
+        password=password,
+    )
+    user.save()
+    return user
+
+
+def _get_active_account(email):
+    try:
+        user = EmailAccount.objects.get_by_natural_key(email)
+    except EmailAccount.DoesNotExist:
+        return None
+    return user if user.is_active else None
+
+
+def _update_account(user_id, data):
+    EmailAccount.objects.filter(id=user_id).update(updated=timezone.now(), **data)
+    token_cache.invalidate_user(user_id)
+    invalidate_cached_response(me, user_id)
+    return get_object_or_404(project(EmailAccount.objects, AccountOut), id=user_id)
+
+
+def _set_password(user, password):
+    user.password = password
+    user.save(update_fields=['password'])
+
+
+@async_auth_controller.post('/register',
+                            response={200: AccountSignupOut, 400: MessageOut, 403: MessageOut, 500: MessageOut})
+async def register(request, payload: AccountSignupIn):
+    if payload.password1 != payload.password2:
+        return response(HTTPStatus.BAD_REQUEST, {'message': 'Passwords does not match!'})
+
+    if await run_db(_email_registered, payload.email):
+        return response(403, {'message': 'Forbidden, email is already registered'})
+
+    password = await hashing.amake_password(payload.password1)
+    user = await run_db(_create_account, payload, password)
+    return response(HTTPStatus.OK, {
+        'profile': user,
+        'token': await run_db(create_token, user.id, **user_claims(user))
+    })
+
+
+@async_auth_controller.post('/login', response={200: AccountSigninOut, 404: MessageOut})
+async def login(request, payload: AccountSigninIn):
+    user = await run_db(_get_active_account, payload.email)
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords.
+        await hashing.amake_password(payload.password)
+        return response(HTTPStatus.NOT_FOUND, {'message': 'User not found'})
+
+    if not await hashing.averify_password(user, payload.password):
+        return response(HTTPStatus.NOT_FOUND, {'message': 'User not found'})
+
+    return response(HTTPStatus.OK, {
+        'profile': user,
+        'token': await run_db(create_token, user.id, **user_claims(user))
+    })
+
+
+@async_auth_controller.post('/refresh', response={200: Token, 401: MessageOut})
+async def refresh(request, payload: TokenRefreshIn):
+    token = await run_db(rotate_refresh_token, payload.refresh_token)
+    if token is None:
+        return response(HTTPStatus.UNAUTHORIZED, {'message': 'Invalid or revoked refresh token'})
+    return response(HTTPStatus.OK, token)
+
+
+@async_auth_controller.post('/logout', response={200: MessageOut, 401: MessageOut})
+async def logout(request, payload: TokenRefreshIn):
+    if not await run_db(revoke_refresh_token, payload.refresh_token):
+        return response(HTTPStatus.UNAUTHORIZED, {'message': 'Invalid refresh token'})
+    return response(HTTPStatus.OK, {'message': 'logged out'})
+
+
+@async_auth_controller.get('/me',
+                           auth=AsyncAuthBearer(),
+                           response={200: AccountOut, 400: MessageOut})
+@cache_response(AccountOut)
+async def me(request):
+    user = await aget_current_user(request)
+    return response(HTTPStatus.OK, user)
+
+
+@async_auth_controller.put('/me',
+                           auth=AsyncAuthBearer(),
+                           response={200: AccountOut, 400: MessageOut})
+async def update_me(request, user_in: AccountUpdateIn):
+    user = await run_db(_update_account, request.auth.id, user_in.dict(exclude_none=True))
+    return response(HTTPStatus.OK, user)
+
+
+@async_auth_controller.post('/change-password',
+                            auth=AsyncAuthBearer(),
+                            response={200: MessageOut, 400: MessageOut})
+async def change_password(request, payload: PasswordChangeIn):
+    if payload.new_password1 != payload.new_password2:
+        return response(HTTPStatus.BAD_REQUEST, {'message': 'Passwords do not match!'})
+
+    user = await aget_current_user(request)
+    if not await hashing.acheck_password(payload.old_password, user.password):
+        return response(HTTPStatus.BAD_REQUEST, {'message': 'something went wrong, please try again later'})
+
+    password = await hashing.amake_password(payload.new_password1)
+    await run_db(_set_password, user, password)
+    return response(HTTPStatus.OK, {'message': 'password updated'})
+
+
+@receiver(post_save, sender=EmailAccount)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    invalidate_cached_response(me, instance.pk)
@@ -1,8 +1,14 @@
 from ninja import Router
 from http import HTTPStatus
 from django.contrib.auth import authenticate
-from config.utils.permissions import create_token, AuthBearer
-from config.utils.schemas import MessageOut
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from config.utils.projection import project
+from config.utils.permissions import create_token, AuthBearer, get_request_user, token_cache, user_claims, \
+    rotate_refresh_token, revoke_refresh_token
+from config.utils.response_cache import cache_response, invalidate_cached_response
+from config.utils.schemas import MessageOut, Token, TokenRefreshIn
 from config.utils.utils import response
 from rest_auth.models import EmailAccount
 from rest_auth.schemas.email_account_schemas import AccountSignupOut, AccountSignupIn, AccountSigninOut, \
@@ -12,83 +18,93 @@ from django.shortcuts import get_object_or_404
 auth_controller = Router(tags=['auth'])
 
 
-@auth_controller.post('/register', response={200: AccountSignupOut, 403: MessageOut, 500: MessageOut})
+@auth_controller.post('/register', response={200: AccountSignupOut, 400: MessageOut, 403: MessageOut, 500: MessageOut})
 def register(request, payload: AccountSignupIn):
-    # if payload.password1 != payload.password2:
-    #     return response(HTTPStatus.BAD_REQUEST, {'message': 'Passwords does not match!'})
-    #
-    # try:
-    #     EmailAccount.objects.get(email=payload.email)
-    #     return response(403,
-    #                     {'message': 'Forbidden, email is already registered'})
-    # except EmailAccount.DoesNotExist:
-    #     user = EmailAccount.objects.create_user(first_name=payload.first_name, last_name=payload.last_name,
-    #                                             email=payload.email, password=payload.password1)
-    #     if user:
-    #         token = create_token(user.id)
-    #         return response(HTTPStatus.OK, {
-    #             'profile': user,
-    #             'token': token
-    #         })
-    #     else:
-    #         return response(HTTPStatus.INTERNAL_SERVER_ERROR, {'message': 'An error occurred, please try again.'})
-    pass
+    if payload.password1 != payload.password2:
+        return response(HTTPStatus.BAD_REQUEST, {'message': 'Passwords does not match!'})
+
+    try:
+        EmailAccount.objects.get_by_natural_key(payload.email)
+        return response(403,
+                        {'message': 'Forbidden, email is already registered'})
+    except EmailAccount.DoesNotExist:
+        user = EmailAccount.objects.create_user(first_name=payload.first_name, last_name=payload.last_name,
+                                                email=payload.email, password=payload.password1)
+        if user:
+            token = create_token(user.id, **user_claims(user))
+            return response(HTTPStatus.OK, {
+                'profile': user,
+                'token': token
+            })
+        else:
+            return response(HTTPStatus.INTERNAL_SERVER_ERROR, {'message': 'An error occurred, please try again.'})
 
 
 @auth_controller.post('/login', response={200: AccountSigninOut, 404: MessageOut})
 def login(request, payload: AccountSigninIn):
-    # user = authenticate(email=payload.email, password=payload.password)
-    # if user is not None:
-    #     return response(HTTPStatus.OK, {
-    #         'profile': user,
-    #         'token': create_token(user.id)
-    #     })
-    # return response(HTTPStatus.NOT_FOUND, {'message': 'User not found'})
-    pass
+    user = authenticate(email=payload.email, password=payload.password)
+    if user is not None:
+        return response(HTTPStatus.OK, {
+            'profile': user,
+            'token': create_token(user.id, **user_claims(user))
+        })
+    return response(HTTPStatus.NOT_FOUND, {'message': 'User not found'})
+
+
+@auth_controller.post('/refresh', response={200: Token, 401: MessageOut})
+def refresh(request, payload: TokenRefreshIn):
+    token = rotate_refresh_token(payload.refresh_token)
+    if token is None:
+        return response(HTTPStatus.UNAUTHORIZED, {'message': 'Invalid or revoked refresh token'})
+    return response(HTTPStatus.OK, token)
+
+
+@auth_controller.post('/logout', response={200: MessageOut, 401: MessageOut})
+def logout(request, payload: TokenRefreshIn):
+    if not revoke_refresh_token(payload.refresh_token):
+        return response(HTTPStatus.UNAUTHORIZED, {'message': 'Invalid refresh token'})
+    return response(HTTPStatus.OK, {'message': 'logged out'})
 
 
 @auth_controller.get('/me',
-                     auth=AuthBearer(),
+                     auth=AuthBearer(stateless=True),
                      response={200: AccountOut, 400: MessageOut})
+@cache_response(AccountOut)
 def me(request):
-    # try:
-    #     user = get_object_or_404(EmailAccount, id=request.auth.id)
-    # except:
-    #     return response(HTTPStatus.BAD_REQUEST, {'message': 'token missing'})
-    # return response(HTTPStatus.OK, user)
-    pass
+    # Claims such as is_verified are only as fresh as the token; serialize the row.
+    return response(HTTPStatus.OK, get_request_user(request))
 
 
 @auth_controller.put('/me',
-                     auth=AuthBearer(),
+                     auth=AuthBearer(stateless=True),
                      response={200: AccountOut, 400: MessageOut})
 def update_me(request, user_in: AccountUpdateIn):
-    #     EmailAccount.objects.filter(id=request.auth.id).update(**user_in.dict())
-    #     user = get_object_or_404(EmailAccount, id=request.auth.id)
-    #     if not user:
-    #         return response(HTTPStatus.BAD_REQUEST, data={'message': 'something went wrong'})
-    #     return response(HTTPStatus.OK, user)
-    pass
+    # Columns are NOT NULL; an explicit null leaves the field as it is.
+    EmailAccount.objects.filter(id=request.auth.id).update(updated=timezone.now(), **user_in.dict(exclude_none=True))
+    # update() sends no post_save, drop the cached snapshot and profile explicitly.
+    token_cache.invalidate_user(request.auth.id)
+    invalidate_cached_response(me, request.auth.id)
+    user = get_object_or_404(project(EmailAccount.objects, AccountOut), id=request.auth.id)
+    return response(HTTPStatus.OK, user)
 
 
 @auth_controller.post('/change-password',
                       auth=AuthBearer(),
                       response={200: MessageOut, 400: MessageOut})
 def change_password(request, payload: PasswordChangeIn):
-    # if payload.new_password1 != payload.new_password2:
-    #     return response(HTTPStatus.BAD_REQUEST, {'message': 'Passwords do not match!'})
-    #
-    # try:
-    #     user = get_object_or_404(EmailAccount, id=request.auth.id)
-    # except:
-    #     return response(HTTPStatus.BAD_REQUEST, {'message': 'token missing'})
-    #
-    # user_update = authenticate(email=user.email, password=payload.old_password)
-    #
-    # if user_update is not None:
-    #     user_update.set_password(payload.new_password1)
-    #     user_update.save()
-    #     return response(HTTPStatus.OK, {'message': 'password updated'})
-    #
-    # return response(HTTPStatus.BAD_REQUEST, {'message': 'something went wrong, please try again later'})
-    pass
+    if payload.new_password1 != payload.new_password2:
+        return response(HTTPStatus.BAD_REQUEST, {'message': 'Passwords do not match!'})
+
+    user_update = authenticate(email=request.auth.email, password=payload.old_password)
+
+    if user_update is not None:
+        user_update.set_password(payload.new_password1)
+        user_update.save()
+        return response(HTTPStatus.OK, {'message': 'password updated'})
+
+    return response(HTTPStatus.BAD_REQUEST, {'message': 'something went wrong, please try again later'})
+
+
+@receiver(post_save, sender=EmailAccount)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    invalidate_cached_response(me, instance.pk)
@@ -81,7 +81,7 @@ class AccountUpdateForm(forms.ModelForm):
         if self.is_valid():
             email = self.cleaned_data['email']
             try:
-                account = EmailAccount.objects.exclude(pk=self.instance.pk).get(email=email)
+                account = EmailAccount.objects.filter_by_email(email).exclude(pk=self.instance.pk).get()
             except EmailAccount.DoesNotExist:
                 return email
             raise forms.ValidationError("Email '%s' already in use." % email)
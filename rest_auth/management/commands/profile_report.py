@@ -0,0 +1,94 @@
+import glob
+import json
+import os
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS = ('p95', 'mean', 'max', 'total', 'sql_time')
+
+
+def load_records(path):
+    records = []
+    for filename in glob.glob(os.path.join(path, '*.json')):
+        with open(filename) as file:
+            records.extend(json.load(file))
+    return records
+
+
+def merge_folded(path):
+    stacks = Counter()
+    for filename in glob.glob(os.path.join(path, '*.folded')):
+        with open(filename) as file:
+            for line in file:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+    return stacks
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(records):
+    by_endpoint = defaultdict(list)
+    for record in records:
+        by_endpoint['{} {}'.format(record['method'], record['endpoint'])].append(record)
+
+    rows = []
+    for endpoint, group in by_endpoint.items():
+        count = len(group)
+        durations = [record['duration'] for record in group]
+        rows.append({
+            'endpoint': endpoint,
+            'count': count,
+            'mean': sum(durations) / count,
+            'p95': percentile(durations, 0.95),
+            'max': max(durations),
+            'total': sum(durations),
+            'sql_count': sum(record['sql_count'] for record in group) / count,
+            'sql_time': sum(record['sql_time'] for record in group) / count,
+            'auth_time': sum(record['auth_time'] for record in group) / count,
+            'serialization_time': sum(record['serialization_time'] for record in group) / count,
+        })
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Summarize the slowest endpoints recorded by ProfilingMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=getattr(settings, 'PROFILING_RESULT_PATH', 'profile/'))
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--sort', choices=SORT_KEYS, default='p95')
+        parser.add_argument('--folded', metavar='FILE',
+                            help='Write the merged stack samples to FILE (flamegraph.pl / speedscope input)')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['path']):
+            raise CommandError('No profiles found in {}'.format(options['path']))
+
+        rows = sorted(summarize(load_records(options['path'])), key=lambda row: row[options['sort']], reverse=True)
+        if not rows:
+            self.stdout.write('No profiled requests recorded yet.')
+        else:
+            self.stdout.write('{:<40} {:>6} {:>9} {:>9} {:>9} {:>6} {:>9} {:>9} {:>9}'.format(
+                'endpoint', 'count', 'mean ms', 'p95 ms', 'max ms', 'sql', 'sql ms', 'auth ms', 'ser ms'
+            ))
+            for row in rows[:options['limit']]:
+                self.stdout.write('{:<40} {:>6} {:>9.1f} {:>9.1f} {:>9.1f} {:>6.1f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+                    row['endpoint'][:40], row['count'],
+                    row['mean'] * 1000, row['p95'] * 1000, row['max'] * 1000,
+                    row['sql_count'], row['sql_time'] * 1000,
+                    row['auth_time'] * 1000, row['serialization_time'] * 1000,
+                ))
+
+        if options['folded']:
+            stacks = merge_folded(options['path'])
+            with open(options['folded'], 'w') as file:
+                for stack, count in stacks.most_common():
+                    file.write('{} {}\n'.format(stack, count))
+            self.stdout.write('Wrote {} stacks to {}'.format(len(stacks), options['folded']))
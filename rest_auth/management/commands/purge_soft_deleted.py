@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from rest_auth.management.commands.soft_delete_report import soft_delete_models
+
+
+class Command(BaseCommand):
+    help = 'Hard-delete soft-deleted rows older than the retention period, in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', metavar='app_label.Model')
+        parser.add_argument('--days', type=int, default=30, help='Retention period in days (default: 30)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches')
+        parser.add_argument('--resume', action='store_true', help='Continue from the last checkpointed pk')
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options['days'])
+
+        for model in soft_delete_models(options['models']):
+            label = model._meta.label
+
+            def report(progress):
+                self.stdout.write('{}: batch {}, {} rows purged, {:.0f} rows/s'.format(
+                    label, progress['batches'], progress['rows'], progress['rate'],
+                ))
+
+            progress = model.all_objects.purge(
+                older_than,
+                batch_size=options['batch_size'],
+                sleep=options['sleep'],
+                resume=options['resume'],
+                callback=report if options['verbosity'] > 1 else None,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                '{}: purged {} records ({} rows with cascades) in {:.1f}s'.format(
+                    label, progress['deleted'], progress['rows'], progress['elapsed'],
+                )
+            ))
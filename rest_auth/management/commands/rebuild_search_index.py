@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from rest_auth.search import drop_search_index, install_search_index
+
+
+class Command(BaseCommand):
+    help = ('Recreate the account search index. Needed on SQLite after VACUUM, which can renumber '
+            'the rows it points to; migrate already recreates it after table rebuilds')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        drop_search_index(connection)
+        if install_search_index(connection):
+            self.stdout.write(self.style.SUCCESS('Search index rebuilt on {}'.format(connection.vendor)))
+        else:
+            self.stdout.write(self.style.WARNING(
+                'No search index for {}; searches fall back to icontains'.format(connection.vendor)
+            ))
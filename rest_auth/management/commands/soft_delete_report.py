@@ -0,0 +1,67 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from config.utils.models import SoftDeleteSignalModel
+
+
+def soft_delete_models(labels=None):
+    models = [
+        model for model in apps.get_models()
+        if issubclass(model, SoftDeleteSignalModel)
+    ]
+    if not labels:
+        return models
+
+    selected = []
+    for label in labels:
+        try:
+            model = apps.get_model(label)
+        except (LookupError, ValueError) as exc:
+            raise CommandError(str(exc))
+        if model not in models:
+            raise CommandError('{} is not a soft-delete model'.format(label))
+        selected.append(model)
+    return selected
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return '{:.1f} {}'.format(size, unit)
+        size /= 1024
+    return '{:.1f} TB'.format(size)
+
+
+class Command(BaseCommand):
+    help = 'Report rows held by soft-deleted records in SoftDeleteSignalModel tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', metavar='app_label.Model')
+        parser.add_argument('--explain', action='store_true', help='Print the live and trash query plans')
+
+    def handle(self, *args, **options):
+        models = soft_delete_models(options['models'])
+        if not models:
+            self.stdout.write('No soft-delete models installed.')
+            return
+
+        for model in models:
+            stats = model.all_objects.stats()
+            line = '{label}: {live} live, {deleted} deleted ({ratio:.1%})'.format(
+                label=model._meta.label,
+                live=stats['live'],
+                deleted=stats['deleted'],
+                ratio=stats['deleted_ratio'],
+            )
+            if stats['oldest_deleted_at']:
+                line += ', oldest deleted {}'.format(stats['oldest_deleted_at'].isoformat())
+            if stats['table_bytes'] is not None:
+                line += ', table {}, ~{} held by deleted rows'.format(
+                    format_bytes(stats['table_bytes']),
+                    format_bytes(stats['table_bytes'] * stats['deleted_ratio']),
+                )
+            self.stdout.write(line)
+
+            if options['explain']:
+                self.stdout.write(model.objects.explain())
+                self.stdout.write(model.objects.explain(trash=True))
@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    """ Store every email lowercased, as EmailAccountManager.normalize_email
+    does for new rows. Emails differing only by case cannot share the unique
+    index below; they are listed and the migration stops until resolved.
+    """
+    EmailAccount = apps.get_model('rest_auth', 'EmailAccount')
+    accounts = EmailAccount.objects.using(schema_editor.connection.alias)
+    duplicates = list(
+        accounts.order_by().annotate(email_lower=Lower('email')).values('email_lower')
+        .annotate(count=Count('pk')).filter(count__gt=1).values_list('email_lower', 'count')[:50]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Accounts whose emails differ only by case: {}. Merge or rename them, then run migrate '
+            'again.'.format(', '.join('{} ({} accounts)'.format(email, count) for email, count in duplicates))
+        )
+    accounts.exclude(email=Lower('email')).update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_auth', '0002_auto_20210819_0400'),
+    ]
+
+    # Django 3.2 has no functional unique constraints; the same statement
+    # works on PostgreSQL and SQLite.
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            sql='CREATE UNIQUE INDEX IF NOT EXISTS rest_auth_emailaccount_email_lower_uniq '
+                'ON rest_auth_emailaccount (LOWER(email));',
+            reverse_sql='DROP INDEX IF EXISTS rest_auth_emailaccount_email_lower_uniq;',
+        ),
+    ]
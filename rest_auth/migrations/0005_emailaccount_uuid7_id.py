@@ -0,0 +1,28 @@
+# Generated by Django 3.2.6 on 2026-10-18 11:43
+
+import config.utils.utils
+from django.db import migrations, models
+
+CREATE_EMAIL_LOWER_INDEX = (
+    'CREATE UNIQUE INDEX IF NOT EXISTS rest_auth_emailaccount_email_lower_uniq '
+    'ON rest_auth_emailaccount (LOWER(email));'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_auth', '0004_revokedtoken'),
+    ]
+
+    # On SQLite the AlterField rebuilds the table, which drops the raw
+    # LOWER(email) index from 0003; recreate it in both directions.
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, reverse_sql=CREATE_EMAIL_LOWER_INDEX),
+        migrations.AlterField(
+            model_name='emailaccount',
+            name='id',
+            field=models.UUIDField(default=config.utils.utils.generate_uuid, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.RunSQL(CREATE_EMAIL_LOWER_INDEX, reverse_sql=migrations.RunSQL.noop),
+    ]
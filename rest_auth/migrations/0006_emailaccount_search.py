@@ -0,0 +1,71 @@
+from django.db import OperationalError, migrations
+
+# Frozen copy of the SQL in rest_auth.search as of this migration.
+DOCUMENT_SQL = "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || email)"
+
+POSTGRESQL_CREATE = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS rest_auth_emailaccount_search_trgm ON rest_auth_emailaccount '
+    'USING gin (({}) gin_trgm_ops)'.format(DOCUMENT_SQL),
+]
+POSTGRESQL_DROP = ['DROP INDEX IF EXISTS rest_auth_emailaccount_search_trgm']
+
+SQLITE_CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS rest_auth_emailaccount_fts USING fts5(first_name, last_name, email, "
+    "content='rest_auth_emailaccount', content_rowid='rowid', tokenize='trigram')"
+)
+SQLITE_CREATE = [
+    'CREATE TRIGGER IF NOT EXISTS rest_auth_emailaccount_fts_ai AFTER INSERT ON rest_auth_emailaccount BEGIN '
+    'INSERT INTO rest_auth_emailaccount_fts(rowid, first_name, last_name, email) '
+    'VALUES (new.rowid, new.first_name, new.last_name, new.email); END',
+    'CREATE TRIGGER IF NOT EXISTS rest_auth_emailaccount_fts_ad AFTER DELETE ON rest_auth_emailaccount BEGIN '
+    'INSERT INTO rest_auth_emailaccount_fts(rest_auth_emailaccount_fts, rowid, first_name, last_name, email) '
+    "VALUES ('delete', old.rowid, old.first_name, old.last_name, old.email); END",
+    'CREATE TRIGGER IF NOT EXISTS rest_auth_emailaccount_fts_au AFTER UPDATE OF first_name, last_name, email '
+    'ON rest_auth_emailaccount BEGIN '
+    'INSERT INTO rest_auth_emailaccount_fts(rest_auth_emailaccount_fts, rowid, first_name, last_name, email) '
+    "VALUES ('delete', old.rowid, old.first_name, old.last_name, old.email); "
+    'INSERT INTO rest_auth_emailaccount_fts(rowid, first_name, last_name, email) '
+    'VALUES (new.rowid, new.first_name, new.last_name, new.email); END',
+    "INSERT INTO rest_auth_emailaccount_fts(rest_auth_emailaccount_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS rest_auth_emailaccount_fts_ai',
+    'DROP TRIGGER IF EXISTS rest_auth_emailaccount_fts_ad',
+    'DROP TRIGGER IF EXISTS rest_auth_emailaccount_fts_au',
+    'DROP TABLE IF EXISTS rest_auth_emailaccount_fts',
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRESQL_CREATE
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_CREATE_TABLE)
+        except OperationalError:
+            # SQLite without FTS5 or older than 3.34 (no trigram tokenizer).
+            return
+        statements = SQLITE_CREATE
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for statement in {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP}.get(vendor, ()):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_auth', '0005_emailaccount_uuid7_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
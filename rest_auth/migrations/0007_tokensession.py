@@ -0,0 +1,23 @@
+# Generated by Django 3.2.6 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_auth', '0006_emailaccount_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenSession',
+            fields=[
+                ('sid', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('user_id', models.CharField(db_index=True, max_length=64)),
+                ('generation', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('revoked_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
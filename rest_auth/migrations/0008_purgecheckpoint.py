@@ -0,0 +1,21 @@
+# Generated by Django 3.2.6 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_auth', '0007_tokensession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurgeCheckpoint',
+            fields=[
+                ('model', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('last_pk', models.CharField(max_length=255)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
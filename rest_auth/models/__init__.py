@@ -1 +1,4 @@
 from .email_account import *
+from .revoked_token import *
+from .token_session import *
+from .purge_checkpoint import *
@@ -1,14 +1,26 @@
 from django.contrib.auth.models import UserManager, AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 
+from config.utils import hashing
 from config.utils.models import Entity
 
 
 class EmailAccountManager(UserManager):
+    @classmethod
+    def normalize_email(cls, email):
+        return super().normalize_email(email).lower()
+
+    def filter_by_email(self, email):
+        # LOWER(email) = %s is served by the unique functional index from
+        # migration 0003, unlike email__iexact's UPPER() comparison.
+        return self.annotate(email_lower=Lower(self.model.USERNAME_FIELD)).filter(
+            email_lower=self.normalize_email(email)
+        )
+
     def get_by_natural_key(self, username):
-        case_insensitive_username_field = '{}__iexact'.format(self.model.USERNAME_FIELD)
-        return self.get(**{case_insensitive_username_field: username})
+        return self.filter_by_email(username).get()
 
     def create_user(self, first_name, last_name, email, password=None):
         if not email:
@@ -52,6 +64,17 @@ class EmailAccount(AbstractUser, Entity):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        self.email = self.__class__.objects.normalize_email(self.email)
+        super().save(*args, **kwargs)
+
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        return hashing.verify_password(self, raw_password)
+
     def has_perm(self, perm, obj=None):
         return self.is_superuser
 
@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class PurgeCheckpoint(models.Model):
+    """ Last primary key purged by ``SoftDeleteSignalsManager.purge`` for a
+    model, saved with each batch so ``resume=True`` continues from it.
+    """
+    model = models.CharField(max_length=255, primary_key=True)
+    last_pk = models.CharField(max_length=255)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '{}: {}'.format(self.model, self.last_pk)
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class RevokedToken(models.Model):
+    """ A revoked session id (``sid``) whose access tokens must be refused.
+
+    Rows are only needed until ``expires_at``, when every access token of the
+    session has expired on its own; the revocation store deletes them after
+    that. Refresh tokens are refused through TokenSession instead.
+    """
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
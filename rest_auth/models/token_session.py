@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class TokenSession(models.Model):
+    """ One login session and the generation of its current refresh token.
+
+    Each refresh bumps ``generation``; a refresh token carrying an older
+    generation is a replayed copy and revokes the session. The row lives
+    until ``expires_at``, the expiry of the newest refresh token.
+    """
+    sid = models.CharField(max_length=64, primary_key=True)
+    user_id = models.CharField(max_length=64, db_index=True)
+    generation = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.sid
@@ -1 +1 @@
-from .common_schemas import *
+from .email_account_schemas import *
@@ -3,10 +3,10 @@ import datetime
 from ninja import Schema
 from pydantic import EmailStr
 
-from config.utils.schemas import Token
+from config.utils.schemas import Token, TrustedSchema
 
 
-class AccountOut(Schema):
+class AccountOut(TrustedSchema):
     email: EmailStr
     first_name: str = None
     last_name: str = None
@@ -27,7 +27,7 @@ class AccountSignupIn(Schema):
     password2: str
 
 
-class AccountSignupOut(Schema):
+class AccountSignupOut(TrustedSchema):
     profile: AccountOut
     token: Token
 
@@ -47,7 +47,7 @@ class AccountUpdateIn(Schema):
     company_website: str = None
 
 
-class AccountSigninOut(Schema):
+class AccountSigninOut(TrustedSchema):
     profile: AccountOut
     token: Token
 
@@ -0,0 +1,134 @@
+"""
+Account search backed by an index on each database.
+
+PostgreSQL: a pg_trgm GIN index on the lowercased name/email document
+serves ``LIKE '%term%'``. SQLite: an external-content FTS5 table with the
+trigram tokenizer, kept in sync by triggers. Terms shorter than three
+characters cannot use either index and fall back to ``icontains``.
+
+Migration 0006 creates the index. On SQLite, a later migration that
+rebuilds the accounts table drops the triggers and may renumber rows, and
+so may VACUUM. ``migrate`` recreates the index afterwards (post_migrate);
+after a VACUUM run ``manage.py rebuild_search_index``.
+"""
+from django.db import OperationalError, connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+from rest_auth.models import EmailAccount
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email')
+MIN_INDEXED_TERM = 3
+
+TABLE = EmailAccount._meta.db_table
+TRGM_INDEX = '{}_search_trgm'.format(TABLE)
+FTS_TABLE = '{}_fts'.format(TABLE)
+# The indexed expression; queries must repeat it exactly for PostgreSQL to use the index.
+DOCUMENT_SQL = "lower(coalesce({0}first_name, '') || ' ' || coalesce({0}last_name, '') || ' ' || {0}email)"
+
+_fts_available = {}
+
+
+def install_search_index(connection):
+    """ Create the search index for ``connection`` (idempotent). """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute('CREATE INDEX IF NOT EXISTS {} ON {} USING gin (({}) gin_trgm_ops)'.format(
+                TRGM_INDEX, TABLE, DOCUMENT_SQL.format('')
+            ))
+        elif connection.vendor == 'sqlite':
+            columns = ', '.join(SEARCH_FIELDS)
+            new_values = ', '.join('new.{}'.format(field) for field in SEARCH_FIELDS)
+            old_values = ', '.join('old.{}'.format(field) for field in SEARCH_FIELDS)
+            try:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', "
+                    "content_rowid='rowid', tokenize='trigram')".format(fts=FTS_TABLE, columns=columns, table=TABLE)
+                )
+            except OperationalError:
+                # SQLite without FTS5 or older than 3.34 (no trigram tokenizer).
+                return False
+            cursor.execute(
+                'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN '
+                'INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new}); END'.format(
+                    fts=FTS_TABLE, table=TABLE, columns=columns, new=new_values)
+            )
+            cursor.execute(
+                "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old}); END".format(
+                    fts=FTS_TABLE, table=TABLE, columns=columns, old=old_values)
+            )
+            cursor.execute(
+                "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+                "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old}); "
+                "INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new}); END".format(
+                    fts=FTS_TABLE, table=TABLE, columns=columns, old=old_values, new=new_values)
+            )
+            cursor.execute("INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(fts=FTS_TABLE))
+        else:
+            return False
+    _fts_available.pop(connection.alias, None)
+    return True
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS {}'.format(TRGM_INDEX))
+        elif connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute('DROP TRIGGER IF EXISTS {}_{}'.format(FTS_TABLE, suffix))
+            cursor.execute('DROP TABLE IF EXISTS {}'.format(FTS_TABLE))
+    _fts_available.pop(connection.alias, None)
+
+
+def has_search_index(connection):
+    if connection.vendor == 'sqlite':
+        return FTS_TABLE in connection.introspection.table_names()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s', [TRGM_INDEX])
+            return cursor.fetchone() is not None
+    return False
+
+
+def has_fts(connection):
+    if connection.alias not in _fts_available:
+        _fts_available[connection.alias] = has_search_index(connection)
+    return _fts_available[connection.alias]
+
+
+def _like_pattern(term):
+    return '%{}%'.format(term.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+
+
+def term_condition(term, connection):
+    if len(term) >= MIN_INDEXED_TERM:
+        if connection.vendor == 'postgresql':
+            return RawSQL(
+                '{} LIKE %s'.format(DOCUMENT_SQL.format(TABLE + '.')),
+                [_like_pattern(term)], output_field=BooleanField(),
+            )
+        if connection.vendor == 'sqlite' and has_fts(connection):
+            return RawSQL(
+                '{table}.rowid IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)'.format(table=TABLE, fts=FTS_TABLE),
+                ['"{}"'.format(term.replace('"', '""'))], output_field=BooleanField(),
+            )
+
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{'{}__icontains'.format(field): term})
+    return condition
+
+
+def search_accounts(queryset, search_term):
+    """ Accounts matching every whitespace separated term, like the admin search. """
+    connection = connections[queryset.db]
+    for bit in smart_split(search_term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+            bit = unescape_string_literal(bit)
+        if bit:
+            queryset = queryset.filter(term_condition(bit, connection))
+    return queryset
@@ -0,0 +1,82 @@
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, override_settings
+
+from config.utils.cache import LazyCullFileBasedCache, LockedFileBasedCache, _culled_at, shared_cache
+from config.utils.permissions import TokenCache
+
+TWO_TIER = {
+    'default': {'BACKEND': 'config.utils.cache.TwoTierCache', 'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 60}},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'two-tier-tests'},
+}
+
+
+@override_settings(CACHES=TWO_TIER)
+class SharedCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    def test_reads_skip_the_local_copy(self):
+        cache.set('key', 'old')
+        # Another worker writes straight to the shared tier.
+        caches['shared'].set('key', 'new')
+        self.assertEqual(cache.get('key'), 'old')
+        self.assertEqual(shared_cache.get('key'), 'new')
+
+    def test_token_cache_sees_version_bump_from_another_worker(self):
+        class User:
+            pk = 1
+
+        tokens = TokenCache(versions=shared_cache)
+        version = tokens.user_version(User.pk)
+        tokens.set('token', float('inf'), User(), version=version)
+        self.assertIsNotNone(tokens.get('token'))
+
+        TokenCache(versions=shared_cache).invalidate_user(User.pk)
+        self.assertIsNone(tokens.get('token'))
+
+
+class LockedFileBasedCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = LockedFileBasedCache(directory.name, {})
+
+    def test_concurrent_increments_are_counted(self):
+        self.cache.add('hits', 0)
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda _: self.cache.incr('hits'), range(200)))
+        self.assertEqual(self.cache.get('hits'), 200)
+
+    def test_add_keeps_existing_value(self):
+        self.assertTrue(self.cache.add('hits', 5))
+        self.assertFalse(self.cache.add('hits', 0))
+        self.assertEqual(self.cache.decr('hits'), 4)
+
+
+class LazyCullFileBasedCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(_culled_at.pop, directory.name, None)
+        self.cache = LazyCullFileBasedCache(directory.name, {'OPTIONS': {'MAX_ENTRIES': 5, 'CULL_INTERVAL': 60}})
+
+    def test_directory_is_listed_once_per_interval(self):
+        with mock.patch.object(LazyCullFileBasedCache, '_list_cache_files', autospec=True,
+                               side_effect=LazyCullFileBasedCache._list_cache_files) as listing:
+            for index in range(10):
+                self.cache.set('key{}'.format(index), index)
+        self.assertEqual(listing.call_count, 1)
+        self.assertEqual(self.cache.get('key9'), 9)
+
+    def test_culls_again_after_the_interval(self):
+        self.cache._cull_interval = 0
+        for index in range(10):
+            self.cache.set('key{}'.format(index), index)
+        self.assertLessEqual(len(self.cache._list_cache_files()), 5)
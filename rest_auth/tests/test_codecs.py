@@ -0,0 +1,110 @@
+import json
+import time
+
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.test import SimpleTestCase
+
+from config.utils.permissions import AsymmetricCodec, HMACCodec, InvalidToken, _b64decode, _b64encode
+
+
+def tamper_header(token, **changes):
+    header, payload, signature = token.split('.')
+    data = json.loads(_b64decode(header.encode('ascii')))
+    data.update(changes)
+    header = _b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+    return '.'.join((header, payload, signature))
+
+
+class TokenCodecTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.rsa_old = rsa.generate_private_key(65537, 2048)
+        cls.rsa_new = rsa.generate_private_key(65537, 2048)
+        cls.ed_key = ed25519.Ed25519PrivateKey.generate()
+
+    def payload(self, **claims):
+        return {'id': 'user', 'sub': 'access', 'exp': int(time.time()) + 60, **claims}
+
+    def codecs(self):
+        return [
+            HMACCodec('secret'),
+            HMACCodec('secret', 'HS512'),
+            AsymmetricCodec('RS256', {}, {'old': self.rsa_old}, active_kid='old'),
+            AsymmetricCodec('EdDSA', {}, {'ed': self.ed_key}, active_kid='ed'),
+        ]
+
+    def test_round_trip(self):
+        for codec in self.codecs():
+            with self.subTest(codec.algorithm):
+                self.assertEqual(codec.decode(codec.encode(self.payload(n=1)))['n'], 1)
+
+    def test_bad_signature(self):
+        for codec in self.codecs():
+            with self.subTest(codec.algorithm):
+                token = codec.encode(self.payload())
+                head, _, signature = token.rpartition('.')
+                forged = head + '.' + ('A' if signature[0] != 'A' else 'B') + signature[1:]
+                with self.assertRaises(InvalidToken):
+                    codec.decode(forged)
+        with self.assertRaises(InvalidToken):
+            HMACCodec('other').decode(HMACCodec('secret').encode(self.payload()))
+
+    def test_tampered_payload(self):
+        codec = HMACCodec('secret')
+        header, _, signature = codec.encode(self.payload()).split('.')
+        payload = _b64encode(json.dumps(self.payload(is_staff=True)).encode('utf-8')).decode('ascii')
+        with self.assertRaises(InvalidToken):
+            codec.decode('.'.join((header, payload, signature)))
+
+    def test_algorithm_mismatch(self):
+        hmac_codec = HMACCodec('secret')
+        rs_codec = AsymmetricCodec('RS256', {}, {'old': self.rsa_old}, active_kid='old')
+        with self.assertRaises(InvalidToken):
+            rs_codec.decode(hmac_codec.encode(self.payload()))
+        with self.assertRaises(InvalidToken):
+            HMACCodec('secret', 'HS512').decode(hmac_codec.encode(self.payload()))
+        with self.assertRaises(InvalidToken):
+            hmac_codec.decode(tamper_header(hmac_codec.encode(self.payload()), alg='none'))
+
+    def test_unknown_kid(self):
+        codec = AsymmetricCodec('RS256', {}, {'old': self.rsa_old}, active_kid='old')
+        token = codec.encode(self.payload())
+        for kid in ('missing', None):
+            with self.assertRaises(InvalidToken):
+                codec.decode(tamper_header(token, kid=kid))
+        signer = AsymmetricCodec('RS256', {}, {'old': self.rsa_old}, active_kid='missing')
+        with self.assertRaises(InvalidToken):
+            signer.encode(self.payload())
+
+    def test_expired(self):
+        for codec in self.codecs():
+            with self.subTest(codec.algorithm):
+                with self.assertRaises(InvalidToken):
+                    codec.decode(codec.encode(self.payload(exp=int(time.time()) - 1)))
+                with self.assertRaises(InvalidToken):
+                    codec.decode(codec.encode(self.payload(exp='tomorrow')))
+
+    def test_malformed(self):
+        codec = HMACCodec('secret')
+        for token in ('', 'abc', 'a.b.c', 'é.x.y'):
+            with self.assertRaises(InvalidToken):
+                codec.decode(token)
+
+    def test_key_rotation(self):
+        old = AsymmetricCodec('RS256', {}, {'old': self.rsa_old}, active_kid='old')
+        old_token = old.encode(self.payload())
+
+        rotated = AsymmetricCodec('RS256', {'old': self.rsa_old.public_key()}, {'new': self.rsa_new},
+                                  active_kid='new')
+        new_token = rotated.encode(self.payload())
+        self.assertEqual(json.loads(_b64decode(new_token.split('.')[0].encode('ascii')))['kid'], 'new')
+        self.assertEqual(rotated.decode(old_token)['id'], 'user')
+        self.assertEqual(rotated.decode(new_token)['id'], 'user')
+
+        retired = AsymmetricCodec('RS256', {}, {'new': self.rsa_new}, active_kid='new')
+        with self.assertRaises(InvalidToken):
+            retired.decode(old_token)
+        with self.assertRaises(InvalidToken):
+            old.decode(new_token)
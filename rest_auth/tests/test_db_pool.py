@@ -0,0 +1,147 @@
+import threading
+import time
+from unittest import mock, skipUnless
+
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+if psycopg2 is not None:
+    from psycopg2 import extensions
+
+    from config.db.backends.postgresql_pool import base as pool_backend
+
+
+class FakeCursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        if self.connection.broken:
+            raise psycopg2.OperationalError('server closed the connection')
+        self.connection.queries.append(sql)
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.in_transaction = False
+        self.queries = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return extensions.TRANSACTION_STATUS_INTRANS
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = 1
+
+
+@skipUnless(psycopg2, 'psycopg2 is not installed')
+class ConnectionPoolTests(SimpleTestCase):
+
+    def pool(self, **kwargs):
+        self.opened = []
+
+        def connect():
+            self.opened.append(FakeConnection())
+            return self.opened[-1]
+
+        return pool_backend.ConnectionPool(connect, **kwargs)
+
+    def test_checkin_returns_the_connection_for_reuse(self):
+        pool = self.pool(max_size=2)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        self.assertIs(pool.checkout(), connection)
+
+        stats = pool.stats()
+        self.assertEqual((stats['checkouts'], stats['opened'], stats['idle']), (2, 1, 0))
+
+    def test_checkin_rolls_back_open_transactions(self):
+        pool = self.pool()
+        connection = pool.checkout()
+        connection.in_transaction = True
+        pool.checkin(connection)
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_closed_connections_are_discarded(self):
+        pool = self.pool()
+        connection = pool.checkout()
+        connection.closed = 1
+        pool.checkin(connection)
+        self.assertIsNot(pool.checkout(), connection)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_stale_connections_are_health_checked(self):
+        pool = self.pool(health_check_interval=0)
+        connection = pool.checkout()
+        pool.checkin(connection)
+        self.assertIs(pool.checkout(), connection)
+        self.assertEqual(connection.queries, ['SELECT 1'])
+
+        pool.checkin(connection)
+        connection.broken = True
+        self.assertIsNot(pool.checkout(), connection)
+        self.assertEqual(len(self.opened), 2)
+
+    def test_waiting_for_a_connection_is_measured(self):
+        pool = self.pool(max_size=1, timeout=5)
+        connection = pool.checkout()
+        checked_out = []
+        waiter = threading.Thread(target=lambda: checked_out.append(pool.checkout()))
+        waiter.start()
+        time.sleep(0.1)
+        pool.checkin(connection)
+        waiter.join(5)
+
+        self.assertEqual(checked_out, [connection])
+        stats = pool.stats()
+        self.assertGreaterEqual(stats['max_wait_seconds'], 0.05)
+        self.assertAlmostEqual(stats['mean_wait_seconds'], stats['wait_seconds'] / 2)
+
+    def test_full_pool_times_out(self):
+        pool = self.pool(max_size=1, timeout=0.01)
+        pool.checkout()
+        with self.assertRaises(OperationalError):
+            pool.checkout()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+
+@skipUnless(psycopg2, 'psycopg2 is not installed')
+class PooledDatabaseWrapperTests(SimpleTestCase):
+
+    def test_close_checks_the_connection_back_in(self):
+        alias = 'pool-test'
+        self.addCleanup(pool_backend._pools.pop, alias, None)
+        wrapper = pool_backend.DatabaseWrapper({'NAME': 'test', 'POOL': {'MAX_SIZE': 3}}, alias)
+
+        with mock.patch.object(pool_backend.base.DatabaseWrapper, 'get_new_connection',
+                               side_effect=lambda conn_params: FakeConnection()):
+            wrapper.connection = wrapper.get_new_connection({})
+        wrapper._close()
+
+        stats = pool_backend.pool_stats()[alias]
+        self.assertEqual((stats['size'], stats['checkouts'], stats['idle']), (3, 1, 1))
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import PBKDF2SHA1PasswordHasher
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from config.utils import hashing
+from config.utils.hashing import HashingPool, HashingUnavailable
+from rest_auth.models import EmailAccount
+
+
+class HashingPoolTests(SimpleTestCase):
+
+    def test_async_hashing_without_workers_leaves_the_event_loop(self):
+        pool = HashingPool(workers=0, max_pending=4, queue_timeout=1, retry_after=1)
+
+        async def hash_on_pool():
+            return await pool.arun(threading.get_ident), threading.get_ident()
+
+        hashing_thread, loop_thread = asyncio.run(hash_on_pool())
+        self.assertNotEqual(hashing_thread, loop_thread)
+        self.assertEqual(pool.metrics.snapshot()['count'], 1)
+
+    def hold_slot(self, pool):
+        """ Occupy the pool's only slot from another thread until cleanup. """
+        started, release = threading.Event(), threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=pool.run, args=(blocker,))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        started.wait(5)
+
+    def test_full_pool_rejects_after_queue_timeout(self):
+        pool = HashingPool(workers=0, max_pending=1, queue_timeout=0.05, retry_after=3)
+        self.hold_slot(pool)
+
+        with self.assertRaises(HashingUnavailable) as raised:
+            pool.run(hashers.make_password, 'secret')
+        self.assertEqual(raised.exception.retry_after, 3)
+        self.assertEqual(pool.metrics.snapshot()['rejected'], 1)
+        self.assertEqual(pool.metrics.snapshot()['in_flight'], 1)
+
+    def test_async_full_pool_rejects_immediately(self):
+        pool = HashingPool(workers=0, max_pending=1, queue_timeout=5, retry_after=1)
+        self.hold_slot(pool)
+
+        started = time.monotonic()
+        with self.assertRaises(HashingUnavailable):
+            asyncio.run(pool.arun(hashers.make_password, 'secret'))
+        self.assertLess(time.monotonic() - started, 1)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class VerifyPasswordTests(TestCase):
+
+    def setUp(self):
+        # In-thread hashing, so settings overrides reach the hasher.
+        patcher = mock.patch.object(hashing, '_pool', HashingPool(workers=0, max_pending=4, queue_timeout=1,
+                                                                    retry_after=1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = EmailAccount.objects.create(email='hash@example.com')
+
+    def stored(self, encoded):
+        EmailAccount.objects.filter(pk=self.user.pk).update(password=encoded)
+        self.user.refresh_from_db()
+
+    def test_other_hasher_is_upgraded(self):
+        self.stored(PBKDF2SHA1PasswordHasher().encode('secret', 'salt'))
+        self.assertTrue(hashing.verify_password(self.user, 'secret'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_other_iteration_count_is_upgraded(self):
+        self.stored(hashers.PBKDF2PasswordHasher().encode('secret', 'salt', iterations=500))
+        self.assertTrue(hashing.verify_password(self.user, 'secret'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_wrong_password_keeps_the_stored_hash(self):
+        encoded = PBKDF2SHA1PasswordHasher().encode('secret', 'salt')
+        self.stored(encoded)
+        self.assertFalse(hashing.verify_password(self.user, 'wrong'))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+
+@override_settings(CACHES={
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'shared', 'ratelimit')
+})
+class HashingUnavailableResponseTests(TestCase):
+
+    def test_busy_pool_is_served_as_503_with_retry_after(self):
+        EmailAccount.objects.create(email='busy@example.com', password='pbkdf2_sha256$1$salt$hash')
+        with mock.patch.object(hashing, 'check_password', side_effect=HashingUnavailable(7)):
+            response = self.client.post('/api/auth/login', {'email': 'busy@example.com', 'password': 'secret'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(response.json(), {'message': 'Server busy, please try again.'})
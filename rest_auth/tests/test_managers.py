@@ -0,0 +1,181 @@
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext, isolate_apps
+from django.utils import timezone
+
+from config.utils.models import SignalsModel, SoftDeleteSignalModel
+from rest_auth.models import PurgeCheckpoint
+
+
+class PurgeTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.isolated_apps = isolate_apps('rest_auth')
+        cls.isolated_apps.enable()
+
+        class Note(SoftDeleteSignalModel):
+            text = models.CharField(max_length=20)
+
+            class Meta(SoftDeleteSignalModel.Meta):
+                app_label = 'rest_auth'
+
+        cls.model = Note
+        # Before TestCase opens its transaction: SQLite cannot alter the schema inside one.
+        with connection.schema_editor() as editor:
+            editor.create_model(Note)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(cls.model)
+        cls.isolated_apps.disable()
+
+    def setUp(self):
+        old = timezone.now() - timedelta(days=60)
+        self.notes = [self.model.objects.create(text=str(index)) for index in range(6)]
+        self.model.all_objects.filter(pk__in=[note.pk for note in self.notes[:5]]).update(
+            is_deleted=True, deleted_at=old
+        )
+
+    def test_purges_expired_trash_only(self):
+        progress = self.model.all_objects.purge(timedelta(days=30), batch_size=2)
+        self.assertEqual(progress['deleted'], 5)
+        self.assertEqual(progress['batches'], 3)
+        self.assertEqual(list(self.model.all_objects.values_list('pk', flat=True)), [self.notes[5].pk])
+        self.assertFalse(PurgeCheckpoint.objects.exists())
+
+    def test_row_restored_after_listing_is_kept(self):
+        restored = self.notes[1]
+        select_for_update = QuerySet.select_for_update
+
+        def restore_first(queryset, *args, **kwargs):
+            self.model.all_objects.filter(pk=restored.pk).update(is_deleted=False, deleted_at=None)
+            return select_for_update(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'select_for_update', restore_first):
+            progress = self.model.all_objects.purge(timedelta(days=30), batch_size=10)
+        self.assertEqual(progress['deleted'], 4)
+        self.assertTrue(self.model.objects.filter(pk=restored.pk).exists())
+
+    def test_resume_from_checkpoint(self):
+        PurgeCheckpoint.objects.create(model=self.model._meta.label_lower, last_pk=str(self.notes[2].pk))
+        progress = self.model.all_objects.purge(timedelta(days=30), batch_size=10, resume=True)
+        self.assertEqual(progress['deleted'], 2)
+        self.assertEqual(
+            sorted(self.model.all_objects.values_list('pk', flat=True)),
+            [note.pk for note in self.notes[:3]] + [self.notes[5].pk],
+        )
+
+    def test_checkpoint_model_setting_is_required(self):
+        for value, message in ((None, 'needs PURGE_CHECKPOINT_MODEL'), ('purgecheckpoint', 'must be of the form'),
+                               ('rest_auth.Missing', 'has not been installed')):
+            with self.subTest(value=value), override_settings(PURGE_CHECKPOINT_MODEL=value):
+                with self.assertRaisesMessage(ImproperlyConfigured, message):
+                    self.model.all_objects.purge(timedelta(days=30))
+        self.assertEqual(self.model.all_objects.count(), 6)
+
+    def test_checkpoint_is_kept_when_interrupted(self):
+        def stop(progress):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.model.all_objects.purge(timedelta(days=30), batch_size=2, callback=stop)
+        self.assertEqual(PurgeCheckpoint.objects.get().last_pk, str(self.notes[1].pk))
+
+
+class SignalsManagerBulkTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.isolated_apps = isolate_apps('rest_auth')
+        cls.isolated_apps.enable()
+
+        class Item(SignalsModel):
+            id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+            name = models.CharField(max_length=20)
+            updated = models.DateTimeField(auto_now=True)
+
+            class Meta:
+                app_label = 'rest_auth'
+
+            def pre_save_record(self, context):
+                self.events.append(('pre_save', self.name, context))
+
+            def post_save_record(self, context):
+                self.events.append(('post_save', self.name, context))
+
+        cls.model = Item
+        with connection.schema_editor() as editor:
+            editor.create_model(Item)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(cls.model)
+        cls.isolated_apps.disable()
+
+    def setUp(self):
+        self.model.events = []
+
+    def items(self, *names):
+        return [self.model(name=name) for name in names]
+
+    def inserts(self, queries):
+        return [query for query in queries if query['sql'].startswith('INSERT')]
+
+    def test_bulk_create_fires_hooks_per_object(self):
+        self.model.objects.bulk_create(self.items('a', 'b'))
+        self.assertEqual(
+            [(event, name, context['is_creation'], context['bulk']) for event, name, context in self.model.events],
+            [('pre_save', 'a', True, True), ('pre_save', 'b', True, True),
+             ('post_save', 'a', True, True), ('post_save', 'b', True, True)],
+        )
+        self.assertEqual(self.model.objects.count(), 2)
+
+    def test_bulk_create_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.model.objects.bulk_create(self.items('a', 'b', 'c', 'd', 'e'), batch_size=2)
+        self.assertEqual(len(self.inserts(queries)), 3)
+        self.assertEqual(self.model.objects.count(), 5)
+
+    def test_bulk_update_refreshes_auto_now(self):
+        items = self.model.objects.bulk_create(self.items('a', 'b'))
+        stale = timezone.now() - timedelta(days=1)
+        self.model.objects.update(updated=stale)
+        for item in items:
+            item.name = item.name.upper()
+        self.model.events = []
+
+        self.model.objects.bulk_update(items, ['name', 'updated'], batch_size=1)
+        self.assertEqual(sorted(self.model.objects.values_list('name', flat=True)), ['A', 'B'])
+        self.assertFalse(self.model.objects.filter(updated=stale).exists())
+        self.assertEqual([context['update_fields'] for _, _, context in self.model.events], [['name', 'updated']] * 4)
+        self.assertFalse(any(context['is_creation'] for _, _, context in self.model.events))
+
+    def test_bulk_upsert_splits_new_and_stored_rows(self):
+        stored = self.model.objects.bulk_create(self.items('a', 'b'))
+        stored[0].name = 'changed'
+        new = self.model(name='c')
+        self.model.events = []
+
+        with CaptureQueriesContext(connection) as queries:
+            created, updated = self.model.objects.bulk_upsert([stored[0], new, stored[1]], ['name'])
+        self.assertEqual(created, [new])
+        self.assertEqual(updated, [stored[0], stored[1]])
+        self.assertEqual(len(self.inserts(queries)), 1)
+        self.assertEqual(sorted(self.model.objects.values_list('name', flat=True)), ['b', 'c', 'changed'])
+        self.assertEqual(
+            [(name, context['is_creation']) for event, name, context in self.model.events if event == 'pre_save'],
+            [('changed', False), ('c', True), ('b', False)],
+        )
@@ -0,0 +1,47 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+BEFORE = [('rest_auth', '0002_auto_20210819_0400')]
+AFTER = [('rest_auth', '0003_emailaccount_email_lower_uniq')]
+
+
+class EmailLowerIndexMigrationTests(TransactionTestCase):
+
+    def setUp(self):
+        self.addCleanup(self.migrate, None)
+        self.migrate(BEFORE)
+        self.accounts = self.apps.get_model('rest_auth', 'EmailAccount').objects
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        if targets is None:
+            targets = executor.loader.graph.leaf_nodes()
+        executor.migrate(targets)
+        self.apps = executor.loader.project_state(targets).apps
+
+    def create(self, email):
+        return self.accounts.create(email=email, password='!')
+
+    def test_emails_are_lowercased(self):
+        account = self.create('Mixed.Case@Example.com')
+        self.migrate(AFTER)
+        accounts = self.apps.get_model('rest_auth', 'EmailAccount').objects
+        self.assertEqual(accounts.get(pk=account.pk).email, 'mixed.case@example.com')
+
+    def test_case_duplicates_are_reported(self):
+        self.create('Dup@example.com')
+        self.create('dup@example.com')
+        with self.assertRaisesMessage(RuntimeError, 'dup@example.com (2 accounts)'):
+            self.migrate(AFTER)
+        self.accounts.filter(email='Dup@example.com').delete()
+
+    def test_index_survives_table_rebuild(self):
+        self.migrate(None)
+        self.create_latest('Case@example.com')
+        with self.assertRaises(IntegrityError):
+            self.create_latest('case@EXAMPLE.com')
+
+    def create_latest(self, email):
+        with transaction.atomic():
+            self.apps.get_model('rest_auth', 'EmailAccount').objects.create(email=email, password='!')
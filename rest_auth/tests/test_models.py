@@ -0,0 +1,265 @@
+import inspect
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+import orjson
+
+from django.db import IntegrityError, connection, models, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import isolate_apps
+
+from config.utils.codes import _pools, code_pool
+from config.utils.models import CodeModel, ModelIndex, SerializerModel, SignalsModel, SingletonModel, \
+    SoftDeleteSignalModel, _singletons
+from config.utils.renderers import dumps
+
+
+@isolate_apps('rest_auth', 'django.contrib.contenttypes')
+class SoftDeleteIndexTests(SimpleTestCase):
+
+    def index_names(self, model):
+        return [index.name for index in model._meta.indexes]
+
+    def test_long_class_names_fit_index_name_limit(self):
+        class CustomerSubscriptionEvent(SoftDeleteSignalModel):
+            pass
+
+        names = self.index_names(CustomerSubscriptionEvent)
+        self.assertTrue(all(len(name) <= 30 for name in names), names)
+        self.assertTrue(names[0].startswith('rest_auth_') and names[0].endswith('_trash'))
+        self.assertEqual(CustomerSubscriptionEvent.check(), [])
+
+    def test_same_class_name_in_two_apps(self):
+        class Comment(SoftDeleteSignalModel):
+            class Meta(SoftDeleteSignalModel.Meta):
+                app_label = 'rest_auth'
+
+        first = self.index_names(Comment)
+
+        class Comment(SoftDeleteSignalModel):  # noqa: F811
+            class Meta(SoftDeleteSignalModel.Meta):
+                app_label = 'contenttypes'
+
+        second = self.index_names(Comment)
+        self.assertEqual(first, ['rest_auth_comment_trash'])
+        self.assertEqual(second, ['contenttypes_comment_trash'])
+
+    def test_subclass_live_index(self):
+        class Invoice(SoftDeleteSignalModel):
+            created = models.DateTimeField()
+
+            class Meta(SoftDeleteSignalModel.Meta):
+                indexes = SoftDeleteSignalModel.Meta.indexes + [
+                    ModelIndex(fields=['-created'], suffix='live', condition=models.Q(is_deleted=False)),
+                ]
+
+        self.assertEqual(self.index_names(Invoice), ['rest_auth_invoice_trash', 'rest_auth_invoice_live'])
+        self.assertEqual(Invoice.check(), [])
+
+    def test_names_survive_clone(self):
+        class CustomerSubscriptionEvent(SoftDeleteSignalModel):
+            pass
+
+        index = CustomerSubscriptionEvent._meta.indexes[0]
+        self.assertEqual(index.clone().name, index.name)
+        self.assertIsInstance(models.Index.clone(index), type(index))
+
+
+@isolate_apps('rest_auth')
+class EventHookTests(SimpleTestCase):
+
+    def scan(self, instance, event_name):
+        """ The per-save discovery the registry replaced. """
+        return [
+            attribute for attribute in dir(instance)
+            if attribute.startswith(event_name) and inspect.ismethod(getattr(instance, attribute))
+        ]
+
+    def test_registry_matches_the_dir_scan(self):
+        calls = []
+
+        class Order(SignalsModel):
+            def pre_save_total(self, context):
+                calls.append('Order.total')
+
+            def pre_save_audit(self, context):
+                calls.append('Order.audit')
+
+            @classmethod
+            def pre_save_stats(cls, context):
+                calls.append('Order.stats')
+
+            @staticmethod
+            def pre_save_helper(context):
+                calls.append('Order.helper')
+
+            def post_delete_cleanup(self, context):
+                pass
+
+        class RushOrder(Order):
+            def pre_save_total(self, context):
+                calls.append('RushOrder.total')
+
+            def pre_save_express(self, context):
+                calls.append('RushOrder.express')
+
+        for model in (Order, RushOrder):
+            for event_name in ('pre_save', 'post_save', 'pre_delete', 'post_delete'):
+                self.assertEqual(list(model.get_event_hooks(event_name)), self.scan(model(), event_name))
+
+        self.assertEqual(Order.get_event_hooks('pre_save'), ('pre_save_audit', 'pre_save_stats', 'pre_save_total'))
+        RushOrder().trigger_event('pre_save', {})
+        self.assertEqual(calls, ['Order.audit', 'RushOrder.express', 'Order.stats', 'RushOrder.total'])
+
+
+@isolate_apps('rest_auth')
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   SINGLETON_CACHE_RECHECK=60)
+class SingletonModelTests(TestCase):
+
+    def setUp(self):
+        class SiteSettings(SingletonModel):
+            name = models.CharField(max_length=20)
+
+        self.model = SiteSettings
+        _singletons.clear()
+        self.addCleanup(_singletons.clear)
+        # No table behind the isolated model; saves stop before the query.
+        patcher = mock.patch.object(models.Model, 'save_base')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_load_returns_a_copy(self):
+        self.model(name='a').publish()
+        self.model.load().name = 'changed'
+        self.assertEqual(self.model.load().name, 'a')
+
+    def test_save_publishes_on_commit(self):
+        self.model(name='a').publish()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.model(name='b').save()
+            self.assertEqual(self.model.load().name, 'a')
+        self.assertEqual(self.model.load().name, 'b')
+
+    def test_rolled_back_save_is_not_published(self):
+        self.model(name='a').publish()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.model(name='rolled').save()
+                raise RuntimeError
+        self.assertEqual(self.model.load().name, 'a')
+
+
+class CodeBulkCreateTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.isolated_apps = isolate_apps('rest_auth')
+        cls.isolated_apps.enable()
+
+        class Voucher(CodeModel):
+            class Meta:
+                app_label = 'rest_auth'
+
+        cls.model = Voucher
+        with connection.schema_editor() as editor:
+            editor.create_model(Voucher)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(cls.model)
+        cls.isolated_apps.disable()
+
+    def setUp(self):
+        self.addCleanup(_pools.clear)
+        self.model.objects.create(code='TAKEN001')
+        # A code pooled before another process inserted it.
+        code_pool(self.model, 'code')._codes.append('TAKEN001')
+
+    def test_taken_pooled_code_is_redrawn(self):
+        vouchers = self.model.objects.bulk_create([self.model(), self.model()])
+        codes = {voucher.code for voucher in vouchers}
+        self.assertNotIn('TAKEN001', codes)
+        self.assertEqual(self.model.objects.filter(code__in=codes).count(), 2)
+
+    def test_explicit_code_collision_is_not_redrawn(self):
+        with self.assertRaises(IntegrityError):
+            self.model.objects.bulk_create([self.model(code='TAKEN001')])
+
+
+class SerializePlanTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.isolated_apps = isolate_apps('rest_auth')
+        cls.isolated_apps.enable()
+
+        class Author(SerializerModel):
+            id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+            name = models.CharField(max_length=20)
+
+            class Meta:
+                app_label = 'rest_auth'
+
+        class Book(SerializerModel):
+            title = models.CharField(max_length=20)
+            isbn = models.UUIDField(default=uuid.uuid4)
+            published = models.DateTimeField(null=True)
+            author = models.ForeignKey(Author, models.CASCADE)
+
+            class Meta:
+                app_label = 'rest_auth'
+
+        class Price(SerializerModel):
+            amount = models.DecimalField(max_digits=8, decimal_places=2)
+            author = models.ForeignKey(Author, models.CASCADE)
+
+            class Meta:
+                app_label = 'rest_auth'
+
+        cls.models = Author, Book, Price
+        with connection.schema_editor() as editor:
+            for model in cls.models:
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            for model in reversed(cls.models):
+                editor.delete_model(model)
+        cls.isolated_apps.disable()
+
+    @classmethod
+    def setUpTestData(cls):
+        Author, Book, Price = cls.models
+        author = Author.objects.create(name='Ada')
+        Book.objects.create(title='Notes', published=datetime(2021, 8, 19, 4, 0, 30, 123456), author=author)
+        Book.objects.create(title='Draft', published=None, author=author)
+        Price.objects.create(amount=Decimal('12.50'), author=author)
+
+    def assertMatchesModelSerializer(self, model):
+        serializer_class = model.get_serializer_class()
+        expected = [serializer_class(obj).data for obj in model.objects.order_by('pk')]
+        queryset = model.objects.order_by('pk')
+        # Compared as the API renders them: the DRF fallback keeps related UUIDs as UUID objects.
+        self.assertEqual(orjson.loads(dumps(list(model.serialize_many(queryset)))), orjson.loads(dumps(expected)))
+        self.assertEqual(orjson.loads(dumps([obj.serialize() for obj in queryset])), orjson.loads(dumps(expected)))
+
+    def test_plain_models_use_the_plan(self):
+        Author, Book, Price = self.models
+        self.assertEqual([name for name, attname, representation in Book.get_serialize_plan()],
+                         ['id', 'title', 'isbn', 'published', 'author'])
+        self.assertMatchesModelSerializer(Author)
+        self.assertMatchesModelSerializer(Book)
+
+    def test_excluded_field_types_fall_back_to_drf(self):
+        Author, Book, Price = self.models
+        self.assertIsNone(Price.get_serialize_plan())
+        self.assertMatchesModelSerializer(Price)
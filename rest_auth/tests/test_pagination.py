@@ -0,0 +1,76 @@
+import base64
+from datetime import datetime, timedelta
+
+from django.test import TestCase
+
+from config.utils.utils import InvalidCursor, cursor_paginated_response, decode_cursor, encode_cursor
+from rest_auth.models import EmailAccount
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        base = datetime(2021, 8, 19, 4, 0, 0, 1000)
+        cls.accounts = [
+            # Microseconds apart, all within the same millisecond.
+            EmailAccount.objects.create(email='user{}@example.com'.format(index),
+                                        date_joined=base + timedelta(microseconds=index))
+            for index in range(5)
+        ]
+
+    def walk(self, ordering, per_page=2):
+        queryset = EmailAccount.objects.all()
+        seen, cursor = [], None
+        for _ in range(len(self.accounts) + 1):
+            page = cursor_paginated_response(queryset, per_page=per_page, cursor=cursor, ordering=ordering)
+            seen.extend(account.email for account in page['data'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return seen
+        self.fail('pagination did not terminate: {}'.format(seen))
+
+    def emails(self, accounts):
+        return [account.email for account in accounts]
+
+    def test_microsecond_timestamps_ascending(self):
+        self.assertEqual(self.walk(['date_joined']), self.emails(self.accounts))
+
+    def test_microsecond_timestamps_descending(self):
+        self.assertEqual(self.walk(['-date_joined']), self.emails(reversed(self.accounts)))
+
+    def test_tied_sort_keys_fall_back_to_pk(self):
+        EmailAccount.objects.update(first_name='same')
+        expected = self.emails(sorted(self.accounts, key=lambda account: account.pk))
+        self.assertEqual(self.walk(['first_name'], per_page=2), expected)
+        # The pk tie-breaker is appended ascending whatever the direction.
+        self.assertEqual(self.walk(['-first_name'], per_page=2), expected)
+
+    def test_nullable_ordering_field(self):
+        last_login = datetime(2021, 9, 1)
+        for index in (1, 3):
+            EmailAccount.objects.filter(pk=self.accounts[index].pk).update(last_login=last_login)
+        logged_in = self.emails(sorted((self.accounts[1], self.accounts[3]), key=lambda account: account.pk))
+        never = self.emails(sorted(self.accounts[::2], key=lambda account: account.pk))
+        self.assertEqual(self.walk(['last_login']), logged_in + never)
+        self.assertEqual(self.walk(['-last_login']), never + logged_in)
+
+    def test_previous_cursor_returns_previous_page(self):
+        queryset = EmailAccount.objects.all()
+        first = cursor_paginated_response(queryset, per_page=2, ordering=['date_joined'])
+        second = cursor_paginated_response(queryset, per_page=2, cursor=first['next_cursor'],
+                                           ordering=['date_joined'])
+        back = cursor_paginated_response(queryset, per_page=2, cursor=second['previous_cursor'],
+                                         ordering=['date_joined'])
+        self.assertEqual(self.emails(back['data']), self.emails(first['data']))
+
+    def test_cursor_round_trips_values(self):
+        values = [datetime(2021, 8, 19, 4, 0, 0, 123456), None, 'text', 3]
+        self.assertEqual(decode_cursor(encode_cursor(values, reverse=True)), (values, True))
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-base64!', base64.urlsafe_b64encode(b'{"v": [["datetime", "x"]], "r": false}').decode()):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+        with self.assertRaises(InvalidCursor):
+            cursor_paginated_response(EmailAccount.objects.all(), cursor=encode_cursor([1]), ordering=['date_joined'])
@@ -0,0 +1,53 @@
+import asyncio
+from unittest import mock
+
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from config.utils import profiling
+from config.utils.executors import run_db
+from config.utils.profiling import ProfilingMiddleware
+from rest_auth.models import EmailAccount
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(profiling, 'buffer')
+        self.buffer = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.wrappers = None
+
+    def view(self, request):
+        self.wrappers = list(connection.execute_wrappers)
+        EmailAccount.objects.count()
+        return HttpResponse()
+
+    def record(self):
+        (record, stacks), kwargs = self.buffer.add.call_args
+        return record
+
+    @override_settings(PROFILING_ROUTES=(), PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_runs_no_wrapper(self):
+        with mock.patch.object(profiling, '_record_query') as record_query:
+            ProfilingMiddleware(self.view)(RequestFactory().get('/api/auth/me'))
+        self.assertEqual(self.wrappers, [])
+        record_query.assert_not_called()
+        self.buffer.add.assert_not_called()
+
+    @override_settings(PROFILING_ROUTES=('/api/',), PROFILING_SAMPLE_RATE=0.0)
+    def test_sampled_request_counts_its_queries(self):
+        ProfilingMiddleware(self.view)(RequestFactory().get('/api/auth/me'))
+        self.assertEqual(len(self.wrappers), 1)
+        self.assertEqual(self.record()['sql_count'], 1)
+        self.assertEqual(connection.execute_wrappers, [])
+
+    @override_settings(PROFILING_ROUTES=('/api/',), PROFILING_SAMPLE_RATE=0.0)
+    def test_async_request_counts_run_db_queries(self):
+        async def view(request):
+            await run_db(EmailAccount.objects.count)
+            return HttpResponse()
+
+        asyncio.run(ProfilingMiddleware(view)(RequestFactory().get('/api/auth/me')))
+        self.assertEqual(self.record()['sql_count'], 1)
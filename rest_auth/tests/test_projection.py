@@ -0,0 +1,51 @@
+from typing import List
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ninja import Schema
+
+from config.utils.projection import project
+from config.utils.schemas import Paginated
+from config.utils.utils import response
+from rest_auth.models import EmailAccount
+from rest_auth.schemas.email_account_schemas import AccountOut
+
+
+class AccountPage(Paginated):
+    data: List[AccountOut]
+
+
+class AccountWithName(Schema):
+    email: str
+    get_full_name: str
+
+
+class ProjectTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = EmailAccount.objects.create(email='project@example.com', first_name='Ada')
+
+    def selected_columns(self, queries):
+        select = queries[0]['sql']
+        columns = select[len('SELECT '):select.index(' FROM ')]
+        return {column.split('.')[-1].strip('"') for column in columns.split(', ')}
+
+    def test_only_loads_the_schema_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            user = project(EmailAccount.objects, AccountOut).get(pk=self.user.pk)
+        self.assertEqual(self.selected_columns(queries), {'id', *AccountOut.__fields__})
+        self.assertNotIn('password', queries[0]['sql'])
+        self.assertEqual(AccountOut.from_orm(user).first_name, 'Ada')
+
+    def test_paginated_schema_projects_its_rows_and_keeps_the_ordering(self):
+        queryset = EmailAccount.objects.order_by('-last_login')
+        with CaptureQueriesContext(connection) as queries:
+            status, page = response(200, queryset, paginated=True, schema=AccountPage, per_page=5)
+        self.assertEqual(page['data'][0].pk, self.user.pk)
+        self.assertEqual(self.selected_columns(queries), {'id', 'last_login', *AccountOut.__fields__})
+
+    def test_non_field_attributes_load_the_full_row(self):
+        queryset = project(EmailAccount.objects, AccountWithName)
+        self.assertEqual(queryset.query.deferred_loading, (frozenset(), True))
@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import orjson
+from django.test import SimpleTestCase
+from ninja import Schema
+
+from config.utils.renderers import ORJSONRenderer, stream_response
+
+
+class ItemOut(Schema):
+    name: str
+
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_renders_uuids_datetimes_and_decimals(self):
+        value = uuid.UUID('0189c2a4-0b1e-7c3d-8a4f-123456789abc')
+        body = ORJSONRenderer().render(None, {
+            'id': value,
+            'at': datetime(2021, 8, 19, 4, 0, 30, 123456),
+            'price': Decimal('12.50'),
+            'ids': (value,),
+        }, response_status=200)
+        self.assertEqual(orjson.loads(body), {
+            'id': '0189c2a4-0b1e-7c3d-8a4f-123456789abc',
+            'at': '2021-08-19T04:00:30.123456',
+            'price': '12.50',
+            'ids': ['0189c2a4-0b1e-7c3d-8a4f-123456789abc'],
+        })
+
+
+class ORJSONParserTests(SimpleTestCase):
+
+    def test_malformed_body_is_a_400(self):
+        response = self.client.post('/api/auth/login', b'{"email": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'detail': 'Cannot parse request body'})
+
+
+class StreamResponseTests(SimpleTestCase):
+
+    def streamed(self, response):
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        return chunks, orjson.loads(b''.join(chunks))
+
+    def test_streams_generators_in_chunks(self):
+        items = (SimpleNamespace(name=str(index), secret='x') for index in range(5))
+        response = stream_response({'total_count': 5, 'data': items}, schema=ItemOut, chunk_size=2)
+
+        chunks, data = self.streamed(response)
+        self.assertEqual(response['Content-Type'], 'application/json; charset=utf-8')
+        self.assertEqual(data, {'total_count': 5, 'data': [{'name': str(index)} for index in range(5)]})
+        # Three chunks of items between the brackets.
+        self.assertEqual(len([chunk for chunk in chunks if chunk.lstrip(b',').startswith(b'{"name"')]), 3)
+
+    def test_empty_stream_is_an_empty_array(self):
+        response = stream_response(iter(()), status=201)
+        chunks, data = self.streamed(response)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(data, [])
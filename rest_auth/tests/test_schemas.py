@@ -0,0 +1,50 @@
+import datetime
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+from pydantic import ValidationError
+
+from config.utils.schemas import TrustedSchema
+from rest_auth.schemas.email_account_schemas import AccountOut, AccountSigninOut
+
+
+class TrustedSchemaTests(SimpleTestCase):
+
+    def account(self, **values):
+        return {'email': 'trusted@example.com', 'date_joined': datetime.datetime(2021, 8, 19), **values}
+
+    def test_missing_required_field_raises_validation_error(self):
+        account = self.account()
+        del account['date_joined']
+        with self.assertRaises(ValidationError) as raised:
+            AccountOut.construct_from(account)
+        self.assertEqual(raised.exception.errors(), [
+            {'loc': ('date_joined',), 'msg': 'field required', 'type': 'value_error.missing'},
+        ])
+
+    def test_missing_required_attribute_on_orm_objects(self):
+        with self.assertRaises(ValidationError):
+            AccountOut.from_orm(SimpleNamespace(email='trusted@example.com'))
+
+    def test_optional_fields_take_their_default(self):
+        account = AccountOut.construct_from(self.account())
+        self.assertIsNone(account.first_name)
+        self.assertEqual(account.dict()['first_name'], None)
+        self.assertEqual(account.__fields_set__, {'email', 'date_joined'})
+
+    def test_values_are_not_coerced(self):
+        account = AccountOut.construct_from(self.account(is_verified='no'))
+        self.assertEqual(account.is_verified, 'no')
+
+    def test_nested_schemas_are_checked(self):
+        token = {'access_token': 'a', 'refresh_token': 'r', 'token_type': 'bearer'}
+        signin = AccountSigninOut.construct_from({'profile': self.account(), 'token': token})
+        self.assertIsInstance(signin.profile, AccountOut)
+
+        with self.assertRaises(ValidationError):
+            AccountSigninOut.construct_from({'profile': {'email': 'trusted@example.com'}, 'token': token})
+
+    def test_instances_pass_through_validate(self):
+        account = AccountOut.construct_from(self.account())
+        self.assertIs(AccountOut.validate(account), account)
+        self.assertIsInstance(TrustedSchema.validate({}), TrustedSchema)
@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from rest_auth.apps import restore_search_index
+from rest_auth.models import EmailAccount
+from rest_auth.search import has_search_index, search_accounts
+
+
+class SearchAccountsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = EmailAccount.objects.create(email='ada.lovelace@example.com', first_name='Ada', last_name='Lovelace')
+        cls.grace = EmailAccount.objects.create(email='grace_hopper@example.org', first_name='Grace',
+                                                last_name='Hopper')
+
+    def search(self, term):
+        return sorted(search_accounts(EmailAccount.objects.all(), term).values_list('email', flat=True))
+
+    def test_index_is_installed(self):
+        if connection.vendor in ('postgresql', 'sqlite'):
+            self.assertTrue(has_search_index(connection))
+
+    def test_terms_match_any_field_and_all_terms(self):
+        self.assertEqual(self.search('LOVE'), [self.ada.email])
+        self.assertEqual(self.search('ada lovelace'), [self.ada.email])
+        self.assertEqual(self.search('hop example.org'), [self.grace.email])
+        self.assertEqual(self.search('ada hopper'), [])
+        self.assertEqual(self.search('example'), [self.ada.email, self.grace.email])
+
+    def test_quoted_and_special_characters(self):
+        self.assertEqual(self.search('"grace_h"'), [self.grace.email])
+        self.assertEqual(self.search('e_h'), [self.grace.email])
+        self.assertEqual(self.search('100%'), [])
+        self.assertEqual(self.search('say "hi'), [])
+
+    def test_short_terms_fall_back_to_icontains(self):
+        self.assertEqual(self.search('gr'), [self.grace.email])
+        self.assertEqual(self.search('a'), [self.ada.email, self.grace.email])
+
+    def test_index_follows_updates_and_deletes(self):
+        EmailAccount.objects.filter(pk=self.grace.pk).update(last_name='Murray')
+        self.assertEqual(self.search('murr'), [self.grace.email])
+        self.assertEqual(self.search('hopper'), [self.grace.email])  # still in the email
+        self.assertEqual(self.search('Hopper grace Murray'), [self.grace.email])
+
+        self.grace.delete()
+        self.assertEqual(self.search('murr'), [])
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('lovelace'), [self.ada.email])
+        EmailAccount.objects.create(email='new.account@example.com')
+        self.assertEqual(self.search('new.acc'), ['new.account@example.com'])
+
+    def test_migrate_restores_dropped_triggers(self):
+        if connection.vendor != 'sqlite' or not has_search_index(connection):
+            self.skipTest('SQLite FTS5 index only')
+        with connection.cursor() as cursor:
+            # What a table rebuild by a later migration leaves behind.
+            cursor.execute('DROP TRIGGER rest_auth_emailaccount_fts_ai')
+        EmailAccount.objects.create(email='missed@example.com')
+        self.assertEqual(self.search('missed'), [])
+
+        restore_search_index(using=connection.alias)
+        self.assertEqual(self.search('missed'), ['missed@example.com'])
+        EmailAccount.objects.create(email='indexed@example.com')
+        self.assertEqual(self.search('indexed'), ['indexed@example.com'])
@@ -0,0 +1,128 @@
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+
+from config.utils.permissions import RevocationStore, TokenCache, create_token, decode_access_token, \
+    get_current_user, revocation_store, revoke_refresh_token, rotate_refresh_token, token_cache
+from rest_auth.models import EmailAccount, RevokedToken, TokenSession
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RevocationTestCase(TestCase):
+
+    def setUp(self):
+        # No sync thread in tests, and no revocations left over between them.
+        patcher = mock.patch.multiple(revocation_store, sync_interval=0, _expires={}, _heap=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class RefreshRotationTests(RevocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = EmailAccount.objects.create(email='rotate@example.com')
+        self.token = create_token(self.user.pk)
+
+    def test_rotation_keeps_one_row_per_session(self):
+        token = self.token
+        for _ in range(50):
+            token = rotate_refresh_token(token['refresh_token'])
+            self.assertIsNotNone(token)
+        self.assertEqual(TokenSession.objects.get().generation, 50)
+        self.assertFalse(RevokedToken.objects.exists())
+        self.assertEqual(len(revocation_store), 0)
+        self.assertIsNotNone(decode_access_token(token['access_token']))
+
+    def test_replayed_refresh_token_revokes_session(self):
+        rotated = rotate_refresh_token(self.token['refresh_token'])
+        self.assertIsNone(rotate_refresh_token(self.token['refresh_token']))
+
+        self.assertIsNotNone(TokenSession.objects.get().revoked_at)
+        self.assertIsNone(rotate_refresh_token(rotated['refresh_token']))
+        self.assertIsNone(decode_access_token(rotated['access_token']))
+        self.assertIsNone(decode_access_token(self.token['access_token']))
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        other = create_token(self.user.pk)
+        self.assertTrue(revoke_refresh_token(self.token['refresh_token']))
+
+        self.assertIsNone(decode_access_token(self.token['access_token']))
+        self.assertIsNone(rotate_refresh_token(self.token['refresh_token']))
+        self.assertIsNotNone(decode_access_token(other['access_token']))
+        self.assertIsNotNone(rotate_refresh_token(other['refresh_token']))
+
+    def test_access_token_is_not_a_refresh_token(self):
+        self.assertIsNone(rotate_refresh_token(self.token['access_token']))
+
+    def test_inactive_user_cannot_refresh(self):
+        EmailAccount.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(rotate_refresh_token(self.token['refresh_token']))
+
+
+class RevocationSyncTests(RevocationTestCase):
+
+    def test_sync_pulls_revocations_from_other_workers(self):
+        user = EmailAccount.objects.create(email='sync@example.com')
+        token = create_token(user.pk)
+        revoke_refresh_token(token['refresh_token'])
+
+        sid = TokenSession.objects.get().sid
+
+        worker = RevocationStore(sync_interval=0)
+        self.assertFalse(worker.is_revoked(sid))
+        worker.sync()
+        self.assertTrue(worker.is_revoked(sid))
+
+    def test_sweep_deletes_expired_rows(self):
+        store = RevocationStore(sync_interval=0)
+        store.revoke('expired', 1)
+        store.revoke('live', 4102444800)
+        store.sweep()
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertFalse(store.is_revoked('expired'))
+
+    def test_failed_sync_is_logged(self):
+        store = RevocationStore(sync_interval=0)
+        with mock.patch.object(store, 'sync', side_effect=RuntimeError('database is gone')), \
+                self.assertLogs('config.utils.permissions', 'ERROR') as logs:
+            store.run_once()
+        self.assertIn('Token revocation sync failed', logs.output[0])
+
+
+class TokenCacheTests(RevocationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.versions = LocMemCache('token-cache-tests', {})
+        self.versions.clear()
+        self.user = EmailAccount.objects.create(email='cached@example.com')
+
+    def test_invalidation_reaches_other_workers(self):
+        worker_a = TokenCache(versions=self.versions)
+        worker_b = TokenCache(versions=self.versions)
+        version = worker_a.user_version(self.user.pk)
+        worker_a.set('token', 4102444800, self.user, version=version)
+        self.assertEqual(worker_a.get('token'), self.user)
+
+        worker_b.invalidate_user(self.user.pk)
+        self.assertIsNone(worker_a.get('token'))
+        self.assertEqual(len(worker_a), 0)
+
+    def test_entry_loaded_before_invalidation_is_stale(self):
+        cache = TokenCache(versions=self.versions)
+        version = cache.user_version(self.user.pk)
+        TokenCache(versions=self.versions).invalidate_user(self.user.pk)
+        cache.set('token', 4102444800, self.user, version=version)
+        self.assertIsNone(cache.get('token'))
+
+    def test_saving_the_user_drops_cached_principals(self):
+        token = create_token(self.user.pk)['access_token']
+        self.assertEqual(get_current_user(token).first_name, '')
+        self.assertIsNotNone(token_cache.get(token))
+
+        self.user.first_name = 'changed'
+        self.user.save()
+        self.assertIsNone(token_cache.get(token))
+        self.assertEqual(get_current_user(token).first_name, 'changed')
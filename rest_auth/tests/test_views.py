@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from config.utils.permissions import AsyncAuthBearer, TokenPrincipal, create_token, get_current_user, \
+    revocation_store, token_cache, user_claims
+from rest_auth.models import EmailAccount
+
+LOCMEM = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'shared', 'ratelimit')
+}
+
+
+@override_settings(CACHES=LOCMEM)
+class AuthViewTestCase(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(revocation_store, sync_interval=0, _expires={}, _heap=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = EmailAccount.objects.create_user(email='me@example.com', password='secret-pass',
+                                                     first_name='Ada', last_name='Lovelace')
+        self.token = create_token(self.user.pk, **user_claims(self.user))['access_token']
+
+    def auth(self, token=None):
+        return {'HTTP_AUTHORIZATION': 'Bearer {}'.format(token or self.token)}
+
+
+class MeViewTests(AuthViewTestCase):
+
+    def test_me_serializes_the_stored_account(self):
+        self.user.is_verified = True
+        self.user.save()
+
+        response = self.client.get('/api/auth/me', **self.auth())
+        self.assertEqual(response.status_code, 200)
+        # The token still carries is_verified=False.
+        self.assertIs(response.json()['is_verified'], True)
+
+    def test_put_me_ignores_null_for_required_columns(self):
+        response = self.client.put('/api/auth/me', {'first_name': None, 'company_name': 'Engines'},
+                                   content_type='application/json', **self.auth())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Ada')
+        self.assertEqual(response.json()['company_name'], 'Engines')
+
+
+class AsyncAuthBearerTests(AuthViewTestCase):
+
+    def test_authenticate_stays_off_the_shared_cache(self):
+        # A cached token makes token_cache.get read the version key.
+        get_current_user(self.token)
+        self.assertEqual(len(token_cache), 1)
+
+        versions = mock.Mock(get=mock.Mock(side_effect=AssertionError('shared cache read on the event loop')))
+        with mock.patch.object(token_cache, 'versions', versions):
+            principal = AsyncAuthBearer().authenticate(None, self.token)
+        self.assertIsInstance(principal, TokenPrincipal)
+        self.assertEqual(principal.load().pk, self.user.pk)
+
+    def test_authenticate_rejects_revoked_sessions(self):
+        sid = AsyncAuthBearer().authenticate(None, self.token)._token_data.sid
+        revocation_store.revoke(sid, 2 ** 31)
+        self.assertIsNone(AsyncAuthBearer().authenticate(None, self.token))
+
+
+class CachedMeResponseTests(AuthViewTestCase):
+
+    def get_me(self, token=None, **headers):
+        return self.client.get('/api/auth/me', **self.auth(token), **headers)
+
+    def test_etag_round_trip(self):
+        first = self.get_me()
+        self.assertEqual(first.status_code, 200)
+
+        cached = self.get_me(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], first['ETag'])
+        self.assertEqual(cached.content, b'')
+
+        self.assertEqual(self.get_me(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_if_modified_since(self):
+        first = self.get_me()
+        self.assertEqual(self.get_me(HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+        self.assertEqual(self.get_me(HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT').status_code, 200)
+        # If-None-Match wins over If-Modified-Since.
+        response = self.get_me(HTTP_IF_NONE_MATCH='"other"', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_put_me_invalidates_the_cached_profile(self):
+        first = self.get_me()
+        self.client.put('/api/auth/me', {'first_name': 'Grace'}, content_type='application/json', **self.auth())
+
+        response = self.get_me(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Grace')
+
+    def test_entries_are_kept_per_identity(self):
+        other = EmailAccount.objects.create_user(email='other@example.com', password='secret-pass',
+                                                  first_name='Grace', last_name='Hopper')
+        other_token = create_token(other.pk, **user_claims(other))['access_token']
+
+        mine = self.get_me()
+        theirs = self.get_me(other_token, HTTP_IF_NONE_MATCH=mine['ETag'])
+        self.assertEqual(theirs.status_code, 200)
+        self.assertEqual(theirs.json()['email'], 'other@example.com')
+        self.assertEqual(self.get_me().json()['email'], 'me@example.com')